@@ -0,0 +1,258 @@
+"""
+Асинхронные версии эндпоинтов статистики и кодирования Хаффмана.
+
+Используются при запуске под ASGI (SERVER_MODE=asgi). Загрузка объектов
+из БД выполняется асинхронно, а расчет TF-IDF и кодирование - в отдельном
+пуле потоков, чтобы долгие запросы не блокировали цикл событий.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.views import APIView
+from core.models import Collections, Document, DocumentMetrics, CollectionMetrics
+from core.metrics import aggregator
+from users.permissions import IsOwner
+from .renderers import JSONRenderer
+from .views import (
+    COLLECTION_STATISTICS_FIELDS,
+    DOCUMENT_HUFFMAN_FIELDS,
+    DOCUMENT_STATISTICS_FIELDS,
+    HUFFMAN_OUTPUTS,
+    collection_statistics_data,
+    document_statistics_data,
+    etag_matches,
+    huffman_binary_response,
+    huffman_data,
+    huffman_etag,
+    parse_statistics_order
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_EXECUTOR_WORKERS,
+    thread_name_prefix='tfidf'
+)
+
+
+def _call(func, *args, **kwargs):
+    """Вызывает функцию в потоке пула, закрывая устаревшие соединения с БД."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_executor(func, *args, **kwargs):
+    """
+    Выполняет синхронную функцию в пуле потоков.
+
+    Args:
+        func: функция для расчетов, может обращаться к БД
+    """
+    return await sync_to_async(
+        _call,
+        thread_sensitive=False,
+        executor=executor
+    )(func, *args, **kwargs)
+
+
+def render_json(data, response_status=status.HTTP_200_OK, headers=None):
+    """Формирует JSON-ответ тем же рендерером, что и синхронные представления."""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=response_status,
+        headers=headers,
+        content_type=JSONRenderer.media_type
+    )
+
+
+def json_response(endpoint, data, response_status=status.HTTP_200_OK,
+                  headers=None):
+    """
+    Формирует JSON-ответ, измеряя время рендеринга и размер ответа.
+
+    Args:
+        endpoint: имя эндпоинта для метрик
+    """
+    with aggregator.stage(endpoint, 'render'):
+        response = render_json(data, response_status, headers)
+    aggregator.observe('response_bytes', endpoint, len(response.content))
+    return response
+
+
+class AccessView(APIView):
+    """
+    Проверки доступа синхронных представлений (OwnerViewSet).
+
+    Аутентификация, разрешения и ограничение частоты запросов выполняются
+    классами DRF из настроек, а ошибки формируются handle_exception,
+    поэтому ответы 401 и 429 совпадают с ответами синхронных представлений.
+    """
+    permission_classes = (IsOwner,)
+
+
+def check_access(request):
+    """
+    Выполняет проверки доступа AccessView для запроса.
+
+    Returns:
+        HttpResponse: ответ с ошибкой или None, если запрос разрешен
+    """
+    view = AccessView()
+    view.args = ()
+    view.kwargs = {}
+    view.headers = view.default_response_headers
+    view.request = view.initialize_request(request)
+    try:
+        view.initial(view.request)
+    except Exception as error:
+        response = view.handle_exception(error)
+        return view.finalize_response(view.request, response).render()
+    request.user = view.request.user
+    return None
+
+
+async def authenticate(request):
+    """
+    Аутентифицирует запрос и проверяет ограничение частоты запросов.
+
+    Returns:
+        HttpResponse: ответ с ошибкой или None, если запрос разрешен
+    """
+    return await sync_to_async(check_access)(request)
+
+
+def not_found(model):
+    """Возвращает ответ 404 как у get_object_or_404 в синхронных представлениях."""
+    return render_json(
+        {'detail': f'No {model._meta.object_name} matches the given query.'},
+        status.HTTP_404_NOT_FOUND
+    )
+
+
+@require_GET
+async def collection_statistics(request, pk):
+    """Возвращает статистику по коллекции."""
+    error = await authenticate(request)
+    if error:
+        return error
+
+    order = parse_statistics_order(request.GET)
+    if order is None:
+        return render_json(
+            {"error": "Invalid order_by"},
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    collection = await Collections.objects.filter(
+        pk=pk,
+        owner=request.user
+    ).only(*COLLECTION_STATISTICS_FIELDS).afirst()
+    if collection is None:
+        return not_found(Collections)
+
+    data, response_status, headers = await run_in_executor(
+        collection_statistics_data,
+        request,
+        collection,
+        order,
+        request.GET.get('async') in ('1', 'true')
+    )
+    return await run_in_executor(
+        json_response,
+        CollectionMetrics.endpoint,
+        data,
+        response_status,
+        headers
+    )
+
+
+@require_GET
+async def document_statistics(request, pk):
+    """Возвращает статистику по документу."""
+    error = await authenticate(request)
+    if error:
+        return error
+
+    order = parse_statistics_order(request.GET)
+    if order is None:
+        return render_json(
+            {"error": "Invalid order_by"},
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    document = await Document.objects.filter(
+        pk=pk,
+        owner=request.user
+    ).only(*DOCUMENT_STATISTICS_FIELDS).afirst()
+    if document is None:
+        return not_found(Document)
+    collections = [
+        collection async for collection
+        in document.collections.only(*COLLECTION_STATISTICS_FIELDS)
+    ]
+    if not collections:
+        return render_json(
+            {"error": "Document is not in any collection"},
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    data = await run_in_executor(
+        document_statistics_data,
+        document,
+        collections,
+        order
+    )
+    return await run_in_executor(
+        json_response,
+        DocumentMetrics.endpoint,
+        data
+    )
+
+
+@require_GET
+async def huffman(request, pk):
+    """Возвращает содержимое документа, закодированное кодом Хаффмана."""
+    error = await authenticate(request)
+    if error:
+        return error
+
+    output = request.GET.get('output', 'text')
+    if output not in HUFFMAN_OUTPUTS:
+        return render_json(
+            {"error": "Invalid output"},
+            status.HTTP_400_BAD_REQUEST
+        )
+
+    document = await Document.objects.filter(
+        pk=pk,
+        owner=request.user
+    ).only(*DOCUMENT_HUFFMAN_FIELDS).afirst()
+    if document is None:
+        return not_found(Document)
+
+    canonical = request.GET.get('canonical') in ('1', 'true')
+    etag = huffman_etag(document, output, canonical)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    if output == 'binary':
+        response = await run_in_executor(
+            huffman_binary_response, document, canonical
+        )
+    else:
+        data = await run_in_executor(
+            huffman_data, document, output, canonical
+        )
+        response = await run_in_executor(
+            json_response, 'document_huffman', data
+        )
+    response['ETag'] = etag
+    return response
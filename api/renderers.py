@@ -0,0 +1,14 @@
+from rest_framework import renderers
+
+
+class RenderedJSON(str):
+    """JSON, сформированный без сериализаторов DRF."""
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer, передающий готовый JSON (RenderedJSON) без изменений."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, RenderedJSON):
+            return data.encode()
+        return super().render(data, accepted_media_type, renderer_context)
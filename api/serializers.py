@@ -1,5 +1,21 @@
+import base64
+import binascii
+from json.encoder import encode_basestring
+
+from django.conf import settings
 from rest_framework import serializers
-from core.models import Collections, Document
+from core.models import Collections, Document, StatisticsJob
+from core.services import (
+    MAX_CODE_LENGTH,
+    MAX_CODES,
+    MAX_DECODE_CODE_LENGTH,
+    UploadLimitError,
+    bits_to_bytes,
+    bulk_create_documents,
+    codes_from_canonical_table,
+    create_document
+)
+from .renderers import RenderedJSON
 
 
 class WordStatisticsSerializer(serializers.Serializer): 
@@ -21,11 +37,83 @@ class CollectionStatisticsSerializer(serializers.Serializer):
     statistics = WordStatisticsSerializer(many=True)
 
 
+def statistics_json(stats):
+    """
+    Записывает статистику (WordStatistics) в JSON напрямую из столбцов.
+
+    Результат совпадает с выводом StatisticsSerializer, но не проходит
+    через поля DRF для каждого слова.
+    """
+    return RenderedJSON('{"statistics":' + stats.to_json() + '}')
+
+
+def collections_statistics_json(items):
+    """
+    Записывает статистику документа по коллекциям в JSON (см. statistics_json).
+
+    Args:
+        items: пары (коллекция, WordStatistics)
+
+    Returns:
+        RenderedJSON: результат в формате CollectionStatisticsSerializer
+    """
+    return RenderedJSON('[' + ','.join([
+        f'{{"collection_id":{collection.id},'
+        f'"collection_name":{encode_basestring(str(collection))},'
+        f'"statistics":{stats.to_json()}}}'
+        for collection, stats in items
+    ]) + ']')
+
+
+class SearchResultSerializer(serializers.Serializer):
+    """Сериализатор для документа в результатах поиска."""
+    document_id = serializers.IntegerField()
+    title = serializers.CharField()
+    score = serializers.FloatField()
+
+
+class SearchSerializer(serializers.Serializer):
+    """Сериализатор для результатов поиска по коллекции."""
+    query = serializers.CharField()
+    results = SearchResultSerializer(many=True)
+
+
+class SimilarDocumentsSerializer(serializers.Serializer):
+    """Сериализатор для документов, похожих на документ."""
+    document_id = serializers.IntegerField()
+    collection_id = serializers.IntegerField()
+    results = SearchResultSerializer(many=True)
+
+
+class StatisticsJobSerializer(serializers.ModelSerializer):
+    """Сериализатор для задания на расчет статистики."""
+    statistics = WordStatisticsSerializer(
+        source='result',
+        many=True,
+        read_only=True
+    )
+
+    class Meta:
+        model = StatisticsJob
+        fields = (
+            'id',
+            'collection_id',
+            'status',
+            'error',
+            'created_at',
+            'finished_at',
+            'statistics'
+        )
+
+
 class CollectionsCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для создания коллекции."""
     class Meta:
         model = Collections
-        fields = ('id', 'name', 'description')
+        fields = (
+            'id', 'name', 'description',
+            'stop_words', 'stemming', 'min_word_length'
+        )
         extra_kwargs = {
             'name': {'required': False},
             'description': {'required': False}
@@ -38,7 +126,10 @@ class CollectionsSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Collections
-        fields = ('id', 'name', 'description', 'documents')
+        fields = (
+            'id', 'name', 'description',
+            'stop_words', 'stemming', 'min_word_length', 'documents'
+        )
 
     def get_documents(self, obj):
         return list(obj.documents.values_list('id', flat=True))
@@ -75,10 +166,14 @@ class DocumentCreateSerializer(serializers.ModelSerializer):
 
     def validate_file(self, value):
         """Проверяет файл на соответствие требованиям."""
-        if not value.name.endswith('.txt'):
+        if not value.name.lower().endswith('.txt'):
             raise serializers.ValidationError(
                 'Файл должен быть в формате .txt'
             )
+        if value.size > settings.UPLOAD_MAX_FILE_SIZE:
+            raise serializers.ValidationError(
+                f'Размер файла больше {settings.UPLOAD_MAX_FILE_SIZE} байт'
+            )
         return value
 
     def create(self, validated_data):
@@ -86,8 +181,163 @@ class DocumentCreateSerializer(serializers.ModelSerializer):
         file = validated_data['file']
         content = file.read().decode('utf-8')
         title = file.name.rsplit('.', 1)[0]
-        return Document.objects.create(
-            title=title,
-            content=content,
-            owner=self.context['request'].user
+        return create_document(
+            title,
+            content,
+            self.context['request'].user
         )
+
+
+class DocumentBulkCreateSerializer(serializers.Serializer):
+    """Сериализатор для пакетной загрузки документов."""
+    files = serializers.ListField(
+        child=serializers.FileField(),
+        allow_empty=False,
+        write_only=True,
+        help_text='Текстовые файлы .txt или архивы .zip/.tar с ними'
+    )
+    collection = serializers.PrimaryKeyRelatedField(
+        queryset=Collections.objects.only('id', 'owner'),
+        required=False,
+        write_only=True,
+        help_text='Коллекция, в которую добавляются документы'
+    )
+
+    def validate_collection(self, value):
+        """Проверяет, что коллекция принадлежит пользователю."""
+        if value.owner_id != self.context['request'].user.id:
+            raise serializers.ValidationError('Коллекция не найдена')
+        return value
+
+    def create(self, validated_data):
+        """Создает документы и возвращает результаты по каждому файлу."""
+        try:
+            return bulk_create_documents(
+                validated_data['files'],
+                self.context['request'].user,
+                validated_data.get('collection')
+            )
+        except UploadLimitError as error:
+            raise serializers.ValidationError({'files': str(error)})
+
+
+class HuffmanDecodeSerializer(serializers.Serializer):
+    """
+    Сериализатор для декодирования кода Хаффмана.
+
+    Принимает результат эндпоинта кодирования: строку бит encoded_text
+    либо упакованные биты encoded в base64 с их количеством bit_length,
+    и словарь кодов codes либо канонические коды canonical_codes.
+    """
+    encoded_text = serializers.RegexField(
+        r'^[01]*\Z',
+        required=False,
+        allow_blank=True,
+        trim_whitespace=False,
+        help_text="Строка из символов '0'/'1'"
+    )
+    encoded = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        help_text='Упакованные биты в base64'
+    )
+    bit_length = serializers.IntegerField(
+        min_value=0,
+        required=False,
+        help_text='Количество значащих бит в encoded'
+    )
+    codes = serializers.DictField(
+        child=serializers.RegexField(
+            r'^[01]+\Z',
+            max_length=MAX_DECODE_CODE_LENGTH,
+            trim_whitespace=False
+        ),
+        required=False,
+        help_text=(
+            'Словарь {символ: код Хаффмана}, не более '
+            f'{MAX_CODES} символов, коды не длиннее '
+            f'{MAX_DECODE_CODE_LENGTH} бит'
+        )
+    )
+    canonical_codes = serializers.DictField(
+        child=serializers.CharField(
+            trim_whitespace=False,
+            max_length=MAX_CODES
+        ),
+        required=False,
+        help_text=(
+            'Канонические коды: {длина кода: символы этой длины}, '
+            f'длина кода от 1 до {MAX_CODE_LENGTH}, '
+            f'не более {MAX_CODES} символов'
+        )
+    )
+
+    def validate_codes(self, value):
+        """Проверяет количество символов в словаре кодов."""
+        if len(value) > MAX_CODES:
+            raise serializers.ValidationError(
+                f'Не более {MAX_CODES} символов'
+            )
+        return value
+
+    def validate_canonical_codes(self, value):
+        """
+        Проверяет длины кодов и количество символов до построения кодов.
+        """
+        for length in value:
+            if (
+                not length.isdecimal()
+                or not 1 <= int(length) <= MAX_CODE_LENGTH
+            ):
+                raise serializers.ValidationError(
+                    f'Длина кода должна быть от 1 до {MAX_CODE_LENGTH}'
+                )
+        if sum(map(len, value.values())) > MAX_CODES:
+            raise serializers.ValidationError(
+                f'Не более {MAX_CODES} символов'
+            )
+        return value
+
+    def validate(self, attrs):
+        """Проверяет входные данные и упаковывает биты."""
+        if ('encoded_text' in attrs) == ('encoded' in attrs):
+            raise serializers.ValidationError(
+                'Нужно передать либо encoded_text, либо encoded'
+            )
+        if 'encoded_text' in attrs:
+            try:
+                data, bit_length = bits_to_bytes(attrs['encoded_text'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'encoded_text': "Строка должна состоять из символов '0'/'1'"}
+                )
+        else:
+            if 'bit_length' not in attrs:
+                raise serializers.ValidationError(
+                    {'bit_length': 'Обязательное поле для encoded'}
+                )
+            try:
+                data = base64.b64decode(attrs['encoded'], validate=True)
+            except binascii.Error:
+                raise serializers.ValidationError(
+                    {'encoded': 'Некорректная строка base64'}
+                )
+            bit_length = attrs['bit_length']
+        if ('codes' in attrs) == ('canonical_codes' in attrs):
+            raise serializers.ValidationError(
+                'Нужно передать либо codes, либо canonical_codes'
+            )
+        if 'canonical_codes' in attrs:
+            try:
+                codes = codes_from_canonical_table(attrs['canonical_codes'])
+            except ValueError:
+                raise serializers.ValidationError(
+                    {'canonical_codes': 'Некорректные канонические коды'}
+                )
+        else:
+            codes = attrs['codes']
+        if any(len(char) != 1 for char in codes):
+            raise serializers.ValidationError(
+                {'codes': 'Ключи словаря должны быть одиночными символами'}
+            )
+        return {'data': data, 'bit_length': bit_length, 'codes': codes}
@@ -0,0 +1,738 @@
+import base64
+import io
+import json
+import math
+import os
+import tarfile
+import zipfile
+from collections import Counter
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, override_settings
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from rest_framework.throttling import UserRateThrottle
+from rest_framework_simplejwt.tokens import AccessToken
+from api import async_views
+from api.views import HUFFMAN_TABLE_LENGTH, DocumentViewSet
+from core.metrics import aggregator
+from core.models import Document
+from users.models import MyUser
+
+DISPLAYED_WORDS = 5
+DOCUMENTS = 12
+
+
+def setUpModule():
+    # Фоновый сброс метрик писал бы в тестовую БД между тестами
+    aggregator.flusher_pid = os.getpid()
+
+
+def tearDownModule():
+    aggregator.flusher_pid = None
+    with aggregator.lock:
+        aggregator.pending.clear()
+        aggregator.histograms.clear()
+
+
+@override_settings(DISPLAYED_WORDS=DISPLAYED_WORDS)
+class EndpointQueriesTest(APITestCase):
+    """
+    Число запросов к БД и размер ответов эндпоинтов статистики и кодирования.
+
+    Число запросов не должно зависеть от количества документов, коллекций
+    и слов, размер ответа статистики - от размера словаря коллекции.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = MyUser.objects.create_user('reader', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.collections = [
+            self.client.post(
+                '/api/v1/collections/', {'name': name}, format='json'
+            ).json()['id']
+            for name in ('первая', 'вторая')
+        ]
+        self.documents = []
+        for index in range(DOCUMENTS):
+            words = ' '.join(f'слово{index}x{number}' for number in range(20))
+            content = f'общее общее текст {words} {"повтор " * index}'
+            self.documents.append(self.upload(f'{index}.txt', content))
+            for collection in self.collections:
+                self.client.post(
+                    f'/api/v1/collections/{collection}/{self.documents[-1]}/'
+                )
+
+    def upload(self, name, content):
+        response = self.client.post(
+            '/api/v1/documents/',
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['id']
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_collection_statistics_queries(self):
+        url = f'/api/v1/collections/{self.collections[0]}/statistics/'
+        with self.assertNumQueries(3):
+            response = self.get(url)
+
+        statistics = response.json()['statistics']
+        self.assertEqual(len(statistics), DISPLAYED_WORDS)
+        # Ответ содержит только выбранные слова, а не словарь коллекции
+        self.assertLess(len(response.content), DISPLAYED_WORDS * 100)
+
+    def test_document_statistics_queries(self):
+        url = f'/api/v1/documents/{self.documents[-1]}/statistics/'
+        with self.assertNumQueries(4):
+            response = self.get(url)
+
+        data = response.json()
+        self.assertEqual(
+            [item['collection_id'] for item in data],
+            sorted(self.collections)
+        )
+        for item in data:
+            self.assertEqual(len(item['statistics']), DISPLAYED_WORDS)
+        self.assertLess(len(response.content), 2 * DISPLAYED_WORDS * 100)
+
+    def test_cached_statistics_queries(self):
+        url = f'/api/v1/collections/{self.collections[0]}/statistics/'
+        first = self.get(url)
+        with self.assertNumQueries(1):
+            second = self.get(url)
+        self.assertEqual(first.content, second.content)
+
+    def test_huffman_queries(self):
+        url = f'/api/v1/documents/{self.documents[-1]}/huffman/'
+        with self.assertNumQueries(2):
+            text = self.get(url).json()
+        # Кодирование берется из кеша, содержимое документа не загружается
+        with self.assertNumQueries(1):
+            response = self.get(f'{url}?output=base64')
+
+        data = response.json()
+        bit_length = len(text['encoded_text'])
+        self.assertEqual(data['bit_length'], bit_length)
+        # Упакованные биты в base64 занимают 4 символа на каждые 3 байта
+        self.assertEqual(
+            len(data['encoded']),
+            4 * math.ceil(math.ceil(bit_length / 8) / 3)
+        )
+        self.assertEqual(
+            len(base64.b64decode(data['encoded'])),
+            math.ceil(bit_length / 8)
+        )
+        self.assertLess(
+            len(response.content),
+            len(json.dumps(text, ensure_ascii=False).encode())
+        )
+
+
+class HuffmanDecodeTest(APITestCase):
+    """Декодирование результатов эндпоинта кодирования Хаффмана."""
+
+    url = '/api/v1/documents/huffman/decode/'
+    content = 'Съешь же ещё этих мягких французских булок, да выпей чаю!\n'
+
+    def setUp(self):
+        cache.clear()
+        self.user = MyUser.objects.create_user('decoder', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.post(
+            '/api/v1/documents/',
+            {'file': SimpleUploadedFile('a.txt', self.content.encode())},
+            format='multipart'
+        )
+        self.document = response.json()['id']
+
+    def decode(self, data):
+        return self.client.post(self.url, data, format='json')
+
+    def test_round_trip(self):
+        for query in (
+            '', '?output=base64', '?canonical=1', '?output=base64&canonical=1'
+        ):
+            with self.subTest(query=query):
+                encoded = self.client.get(
+                    f'/api/v1/documents/{self.document}/huffman/{query}'
+                ).json()
+                response = self.decode(encoded)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), {'text': self.content})
+
+    def test_binary_round_trip(self):
+        for canonical in ('0', '1'):
+            with self.subTest(canonical=canonical):
+                response = self.client.get(
+                    f'/api/v1/documents/{self.document}/huffman/'
+                    f'?output=binary&canonical={canonical}'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('X-Huffman-Codes', response)
+                content = response.content
+                (length,) = HUFFMAN_TABLE_LENGTH.unpack_from(content)
+                offset = HUFFMAN_TABLE_LENGTH.size
+                table = json.loads(content[offset:offset + length])
+                encoded = content[offset + length:]
+                response = self.decode({
+                    'encoded': base64.b64encode(encoded).decode(),
+                    'bit_length': int(response['X-Huffman-Bit-Length']),
+                    **table
+                })
+                self.assertEqual(response.json(), {'text': self.content})
+
+    def test_invalid_bit_string(self):
+        for bits in ('0101\n', '01_01', ' 0101', '012'):
+            with self.subTest(bits=bits):
+                response = self.decode(
+                    {'encoded_text': bits, 'codes': {'a': '0', 'b': '1'}}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('encoded_text', response.json())
+
+    def test_invalid_codes(self):
+        for code in ('0\n', '', '2'):
+            with self.subTest(code=code):
+                response = self.decode(
+                    {'encoded_text': '01', 'codes': {'a': '1', 'b': code}}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('codes', response.json())
+
+    def test_invalid_bitstream(self):
+        response = self.decode(
+            {'encoded_text': '1', 'codes': {'a': '0', 'b': '10', 'c': '11'}}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_canonical_codes(self):
+        for table in (
+            {'50000000': 'a', '1': 'b'},
+            {'16': 'a', '1': 'b'},
+            {'1e9': 'a'},
+            {'15': ''.join(map(chr, range(32, 32 + 2 ** 15 + 1)))},
+        ):
+            with self.subTest(lengths=list(table)):
+                response = self.decode(
+                    {'encoded_text': '01', 'canonical_codes': table}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('canonical_codes', response.json())
+
+    def test_oversized_codes(self):
+        for codes in (
+            {'a': '1', 'b': '0' * 1000000},
+            {chr(index): '1' for index in range(32, 32 + 2 ** 15 + 1)},
+        ):
+            with self.subTest(size=len(codes)):
+                response = self.decode({'encoded_text': '01', 'codes': codes})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('codes', response.json())
+
+    def test_incomplete_codes(self):
+        response = self.decode(
+            {'encoded_text': '1', 'codes': {'a': '0' * 40 + '1', 'b': '1'}}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+def zip_file(name, members):
+    """Возвращает загружаемый архив zip с файлами {имя: содержимое}."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for member, content in members.items():
+            archive.writestr(member, content)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def tar_file(name, members):
+    """Возвращает загружаемый архив tar.gz с файлами {имя: содержимое}."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for member, content in members.items():
+            info = tarfile.TarInfo(member)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(
+    UPLOAD_MAX_FILES=3,
+    UPLOAD_MAX_FILE_SIZE=1000,
+    UPLOAD_MAX_TOTAL_SIZE=2500
+)
+class BulkUploadLimitsTest(APITestCase):
+    """Ограничения пакетной загрузки документов из архивов."""
+
+    url = '/api/v1/documents/bulk/'
+
+    def setUp(self):
+        self.user = MyUser.objects.create_user('uploader', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, *files):
+        return self.client.post(
+            self.url, {'files': list(files)}, format='multipart'
+        )
+
+    def assert_rejected(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('files', response.json())
+        self.assertFalse(Document.objects.exists())
+
+    def test_extensions_are_case_insensitive(self):
+        response = self.upload(
+            SimpleUploadedFile('NOTES.TXT', 'заметки'.encode()),
+            zip_file('A.ZIP', {'B.Txt': 'текст'.encode()}),
+            tar_file('C.TAR.GZ', {'d.TXT': b'text'}),
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [document.get('id') is not None
+             for document in response.json()['documents']],
+            [True, True, True]
+        )
+
+    def test_file_size_limit(self):
+        # Архив в несколько КБ распаковывается в 1 МБ
+        for archive in (
+            zip_file('bomb.zip', {'a.txt': b'a' * 2 ** 20}),
+            tar_file('bomb.tar.gz', {'a.txt': b'a' * 2 ** 20}),
+        ):
+            with self.subTest(archive=archive.name):
+                self.assert_rejected(self.upload(archive))
+        self.assert_rejected(
+            self.upload(SimpleUploadedFile('a.txt', b'a' * 1001))
+        )
+
+    def test_total_size_limit(self):
+        response = self.upload(zip_file('a.zip', {
+            f'{index}.txt': b'a ' * 450 for index in range(3)
+        }))
+        self.assert_rejected(response)
+
+    def test_files_count_limit(self):
+        # Учитываются и файлы, которые не являются текстовыми
+        response = self.upload(
+            zip_file('a.zip', {'1.txt': b'a', '2.png': b'b', '3.txt': b'c'}),
+            SimpleUploadedFile('4.txt', b'd'),
+        )
+        self.assert_rejected(response)
+
+    def test_limit_rolls_back_saved_batches(self):
+        with self.settings(BULK_UPLOAD_BATCH_SIZE=1):
+            response = self.upload(zip_file('a.zip', {
+                '1.txt': b'one', '2.txt': b'two', '3.txt': b'a' * 1001,
+            }))
+        self.assert_rejected(response)
+
+    def test_single_upload_size_limit(self):
+        response = self.client.post(
+            '/api/v1/documents/',
+            {'file': SimpleUploadedFile('A.TXT', b'a' * 1001)},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            '/api/v1/documents/',
+            {'file': SimpleUploadedFile('A.TXT', b'a' * 1000)},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 201)
+
+
+class OneRequestThrottle(UserRateThrottle):
+    rate = '1/min'
+
+
+class AsyncViewsTest(APITransactionTestCase):
+    """
+    Ответы асинхронных представлений совпадают с ответами синхронных.
+
+    Асинхронные представления выполняют расчеты в отдельном пуле потоков
+    со своими соединениями с БД, поэтому данные тестов фиксируются
+    (APITransactionTestCase).
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = MyUser.objects.create_user('async', password='password')
+        self.stranger = MyUser.objects.create_user('other', password='password')
+        client = self.client_for(self.user)
+        self.document = client.post(
+            '/api/v1/documents/',
+            {'file': SimpleUploadedFile('a.txt', 'мама мыла раму раму'.encode())},
+            format='multipart'
+        ).json()['id']
+        self.collection = client.post(
+            '/api/v1/collections/', {'name': 'коллекция'}, format='json'
+        ).json()['id']
+        client.post(f'/api/v1/collections/{self.collection}/{self.document}/')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def authorization(self, user):
+        return {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    def get(self, view, url, pk, headers):
+        """Возвращает ответы синхронного и асинхронного представлений."""
+        sync_response = APIClient().get(url, headers=headers)
+        request = AsyncRequestFactory().get(url, headers=headers)
+        async_response = async_to_sync(view)(request, pk)
+        return sync_response, async_response
+
+    def assert_same(self, view, url, pk, status_code, headers):
+        sync_response, async_response = self.get(view, url, pk, headers)
+        self.assertEqual(sync_response.status_code, status_code)
+        self.assertEqual(async_response.status_code, status_code)
+        self.assertEqual(async_response.content, sync_response.content)
+        for header in ('Content-Type', 'ETag', 'WWW-Authenticate'):
+            self.assertEqual(
+                async_response.get(header), sync_response.get(header), header
+            )
+        return sync_response
+
+    def endpoints(self):
+        return (
+            (
+                async_views.collection_statistics,
+                f'/api/v1/collections/{self.collection}/statistics/',
+                self.collection,
+            ),
+            (
+                async_views.document_statistics,
+                f'/api/v1/documents/{self.document}/statistics/',
+                self.document,
+            ),
+            (
+                async_views.huffman,
+                f'/api/v1/documents/{self.document}/huffman/',
+                self.document,
+            ),
+        )
+
+    def test_success(self):
+        owner = self.authorization(self.user)
+        for view, url, pk in self.endpoints():
+            with self.subTest(url=url):
+                self.assert_same(view, url, pk, 200, owner)
+        for output in ('base64', 'binary'):
+            with self.subTest(output=output):
+                self.assert_same(
+                    async_views.huffman,
+                    f'/api/v1/documents/{self.document}/huffman/?output={output}',
+                    self.document,
+                    200,
+                    owner
+                )
+
+    def test_bad_request(self):
+        owner = self.authorization(self.user)
+        for view, url, pk in self.endpoints():
+            with self.subTest(url=url):
+                query = 'output' if view is async_views.huffman else 'order_by'
+                self.assert_same(view, f'{url}?{query}=x', pk, 400, owner)
+
+    def test_unauthorized(self):
+        for view, url, pk in self.endpoints():
+            for headers in ({}, {'Authorization': 'Bearer invalid'}):
+                with self.subTest(url=url, headers=headers):
+                    self.assert_same(view, url, pk, 401, headers)
+
+    def test_not_found(self):
+        stranger = self.authorization(self.stranger)
+        for view, url, pk in self.endpoints():
+            with self.subTest(url=url):
+                self.assert_same(view, url, pk, 404, stranger)
+
+    def test_not_modified(self):
+        owner = self.authorization(self.user)
+        view, url, pk = self.endpoints()[-1]
+        etag = self.assert_same(view, url, pk, 200, owner)['ETag']
+        self.assert_same(
+            view, url, pk, 304, {'If-None-Match': etag, **owner}
+        )
+
+    def test_throttled(self):
+        owner = self.authorization(self.user)
+        view, url, pk = self.endpoints()[-1]
+        throttles = (OneRequestThrottle,)
+        with mock.patch.object(
+            DocumentViewSet, 'throttle_classes', throttles
+        ), mock.patch.object(
+            async_views.AccessView, 'throttle_classes', throttles
+        ):
+            sync_response, async_response = self.get(view, url, pk, owner)
+            self.assertEqual(sync_response.status_code, 200)
+            # Ограничение общее для синхронных и асинхронных представлений
+            self.assertEqual(async_response.status_code, 429)
+            sync_response = APIClient().get(url, headers=owner)
+            self.assertEqual(sync_response.status_code, 429)
+        self.assertEqual(async_response.content, sync_response.content)
+        self.assertEqual(
+            async_response['Retry-After'], sync_response['Retry-After']
+        )
+
+
+def tfidf_vectors(texts):
+    """Возвращает TF-IDF векторы текстов {id: текст} без учета порядка слов."""
+    counts = {pk: Counter(text.lower().split()) for pk, text in texts.items()}
+    doc_freq = Counter(word for words in counts.values() for word in words)
+    idf = {
+        word: math.log(len(texts) / freq) for word, freq in doc_freq.items()
+    }
+    return {
+        pk: {
+            word: count / sum(words.values()) * idf[word]
+            for word, count in words.items()
+        }
+        for pk, words in counts.items()
+    }, idf
+
+
+def ranked(scores, k):
+    """Упорядочивает оценки как сервисы: по убыванию, при равенстве по id."""
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+class SearchSimilarTest(APITestCase):
+    """Поиск по коллекции и похожие документы."""
+
+    texts = (
+        'кошка сидит на окне',
+        'собака и кошка кошка',
+        'птица летит над окном',
+        'кошка и собака на окне',
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.user = MyUser.objects.create_user('searcher', password='password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.documents = [
+            self.client.post(
+                '/api/v1/documents/',
+                {'file': SimpleUploadedFile(f'{index}.txt', text.encode())},
+                format='multipart'
+            ).json()['id']
+            for index, text in enumerate(self.texts)
+        ]
+        self.collection = self.client.post(
+            '/api/v1/collections/', {'name': 'поиск'}, format='json'
+        ).json()['id']
+        self.members = self.documents[:3]
+        for document in self.members:
+            self.client.post(f'/api/v1/collections/{self.collection}/{document}/')
+
+    def member_texts(self):
+        return {
+            document: self.texts[self.documents.index(document)]
+            for document in self.members
+        }
+
+    def search(self, query, **params):
+        return self.client.get(
+            f'/api/v1/collections/{self.collection}/search/',
+            {'q': query, **params}
+        )
+
+    def similar(self, document, **params):
+        return self.client.get(
+            f'/api/v1/documents/{document}/similar/',
+            {'collection': self.collection, **params}
+        )
+
+    def expected_search(self, query, k=10):
+        vectors, _ = tfidf_vectors(self.member_texts())
+        query_counts = Counter(query.lower().split())
+        scores = {
+            document: sum(
+                vector[word] * count for word, count in query_counts.items()
+                if word in vector
+            )
+            for document, vector in vectors.items()
+            if query_counts.keys() & vector.keys()
+        }
+        return ranked(scores, k)
+
+    def expected_similar(self, document, k=10):
+        vectors, idf = tfidf_vectors(self.member_texts())
+        # Исходный документ может не входить в коллекцию: IDF его слов
+        # берутся по коллекции, слова с нулевым IDF не учитываются
+        words = Counter(self.texts[self.documents.index(document)].split())
+        source = {
+            word: count / sum(words.values()) * idf[word]
+            for word, count in words.items()
+            if idf.get(word)
+        }
+        source_norm = math.sqrt(sum(value ** 2 for value in source.values()))
+        scores = {}
+        for other, vector in vectors.items():
+            if other == document or not source.keys() & vector.keys():
+                continue
+            norm = math.sqrt(sum(value ** 2 for value in vector.values()))
+            scores[other] = sum(
+                value * vector[word] for word, value in source.items()
+                if word in vector
+            ) / (source_norm * norm)
+        return ranked(scores, k)
+
+    def assert_results(self, response, expected):
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [result['document_id'] for result in results],
+            [document for document, _ in expected]
+        )
+        for result, (document, score) in zip(results, expected):
+            self.assertAlmostEqual(result['score'], score, places=12)
+            self.assertEqual(
+                result['title'], str(self.documents.index(document))
+            )
+
+    def test_search_ranking(self):
+        for query in ('кошка птица', 'Кошка кошка окне', 'на', 'окне птица'):
+            with self.subTest(query=query):
+                self.assert_results(
+                    self.search(query), self.expected_search(query)
+                )
+        self.assert_results(
+            self.search('кошка', k=1), self.expected_search('кошка', k=1)
+        )
+
+    def test_search_unknown_words(self):
+        # Слово из документа вне коллекции тоже неизвестно коллекции
+        for query in ('слон', 'слон жираф', '!!!'):
+            with self.subTest(query=query):
+                response = self.search(query)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['results'], [])
+        self.assert_results(
+            self.search('слон птица'), self.expected_search('птица')
+        )
+
+    def test_search_errors(self):
+        for params in ({'q': ''}, {'q': '   '}, {'q': 'кошка', 'k': 0},
+                       {'q': 'кошка', 'k': 'x'}, {'q': 'кошка', 'k': 10 ** 6}):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    f'/api/v1/collections/{self.collection}/search/', params
+                )
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            f'/api/v1/collections/{self.collection}/search/'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        stranger = APIClient()
+        stranger.force_authenticate(
+            MyUser.objects.create_user('stranger', password='password')
+        )
+        for url in (
+            f'/api/v1/collections/{self.collection}/search/?q=кошка',
+            '/api/v1/collections/999999/search/?q=кошка',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(stranger.get(url).status_code, 404)
+
+    def test_similar_ranking(self):
+        for document in self.documents:
+            with self.subTest(document=document):
+                self.assert_results(
+                    self.similar(document), self.expected_similar(document)
+                )
+        document = self.documents[0]
+        self.assert_results(
+            self.similar(document, k=1), self.expected_similar(document, k=1)
+        )
+
+    def test_similar_errors(self):
+        document = self.documents[0]
+        for params in ({}, {'collection': 'x'}):
+            with self.subTest(params=params):
+                response = self.client.get(
+                    f'/api/v1/documents/{document}/similar/', params
+                )
+                self.assertEqual(response.status_code, 400)
+        for k in (0, 'x', 10 ** 6):
+            with self.subTest(k=k):
+                self.assertEqual(self.similar(document, k=k).status_code, 400)
+
+        self.assertEqual(self.similar(999999).status_code, 404)
+        response = self.client.get(
+            f'/api/v1/documents/{document}/similar/', {'collection': 999999}
+        )
+        self.assertEqual(response.status_code, 404)
+
+        stranger = APIClient()
+        stranger.force_authenticate(
+            MyUser.objects.create_user('stranger', password='password')
+        )
+        other_collection = stranger.post(
+            '/api/v1/collections/', {'name': 'чужая'}, format='json'
+        ).json()['id']
+        response = stranger.get(
+            f'/api/v1/documents/{document}/similar/',
+            {'collection': self.collection}
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            f'/api/v1/documents/{document}/similar/',
+            {'collection': other_collection}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_results_follow_collection_changes(self):
+        source = self.documents[0]
+        added = self.documents[3]
+        url = f'/api/v1/collections/{self.collection}/{added}/'
+        # Нормы документов кешируются для версии коллекции
+        self.assert_results(self.similar(source), self.expected_similar(source))
+
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.members = self.members + [added]
+        response = self.similar(source)
+        self.assertIn(
+            added,
+            [result['document_id'] for result in response.json()['results']]
+        )
+        self.assert_results(response, self.expected_similar(source))
+        self.assert_results(
+            self.search('собака окне'), self.expected_search('собака окне')
+        )
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.members = self.members[:-1]
+        self.assert_results(self.similar(source), self.expected_similar(source))
+        self.assert_results(
+            self.search('собака окне'), self.expected_search('собака окне')
+        )
+
+    def test_empty_collection(self):
+        collection = self.client.post(
+            '/api/v1/collections/', {'name': 'пустая'}, format='json'
+        ).json()['id']
+        response = self.client.get(
+            f'/api/v1/collections/{collection}/search/', {'q': 'кошка'}
+        )
+        self.assertEqual(response.json()['results'], [])
+        response = self.client.get(
+            f'/api/v1/documents/{self.documents[0]}/similar/',
+            {'collection': collection}
+        )
+        self.assertEqual(response.json()['results'], [])
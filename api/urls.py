@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from drf_yasg.views import get_schema_view
@@ -29,19 +30,33 @@ urlpatterns = [
 
     path('status/', views.check_status, name='status'),
     path('metrics/', views.metrics, name='metrics'),
+    path('metrics/prometheus/', views.metrics_prometheus, name='metrics-prometheus'),
     path('version/', views.version, name='version'),
     path('collections/<int:pk>/statistics/', 
          views.CollectionViewSet.as_view({'get': 'get_collection_statistics'}),
          name='collection-statistics'),
+    path('collections/<int:pk>/search/',
+         views.CollectionViewSet.as_view({'get': 'search'}),
+         name='collection-search'),
     path('collections/<int:pk>/<int:document_id>/',
          views.CollectionViewSet.as_view({
              'post': 'create_document',
              'delete': 'destroy_document'
          }),
          name='collection-document'),
+    path('jobs/<int:pk>/', views.statistics_job, name='statistics-job'),
+    path('documents/huffman/decode/',
+         views.decode_huffman,
+         name='huffman-decode'),
+    path('documents/bulk/',
+         views.DocumentViewSet.as_view({'post': 'bulk_upload'}),
+         name='document-bulk'),
     path('documents/<int:pk>/statistics/',
          views.DocumentViewSet.as_view({'get': 'get_document_statistics'}),
          name='document-statistics'),
+    path('documents/<int:pk>/similar/',
+         views.DocumentViewSet.as_view({'get': 'similar'}),
+         name='document-similar'),
     path('documents/<int:pk>/huffman/',
          views.DocumentViewSet.as_view({'get': 'get_huffman'}),
          name='document-huffman'),
@@ -49,3 +64,20 @@ urlpatterns = [
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.jwt')),
 ]
+
+if settings.ASYNC_VIEWS:
+    from . import async_views
+
+    # Под ASGI эндпоинты статистики и кодирования обслуживаются
+    # асинхронными представлениями, объявленными раньше синхронных
+    urlpatterns = [
+        path('collections/<int:pk>/statistics/',
+             async_views.collection_statistics,
+             name='collection-statistics'),
+        path('documents/<int:pk>/statistics/',
+             async_views.document_statistics,
+             name='document-statistics'),
+        path('documents/<int:pk>/huffman/',
+             async_views.huffman,
+             name='document-huffman'),
+    ] + urlpatterns
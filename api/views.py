@@ -1,22 +1,46 @@
+import base64
+import json
+import struct
+
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework.permissions import AllowAny
-from drf_yasg.utils import swagger_auto_schema
+from rest_framework.reverse import reverse
+from drf_yasg import openapi
+from drf_yasg.utils import no_body, swagger_auto_schema
 from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
 from core.models import (
     Collections,
     Document,
     DocumentMetrics,
-    CollectionMetrics
+    CollectionMetrics,
+    StatisticsJob
 )
 from core.constants import VERSION
+from core.metrics import (
+    aggregator,
+    cached_row_counts,
+    latency_summary,
+    render_prometheus
+)
 from core.services import (
-    calculate_document_tfidf,
-    calculate_collection_tfidf,
-    huffman_encode
+    MAX_CODE_LENGTH,
+    STATISTICS_ORDER_KEYS,
+    cached_document_tfidf,
+    bytes_to_bits,
+    cached_collection_tfidf,
+    cached_huffman_encoding,
+    canonical_table,
+    enqueue_collection_statistics,
+    huffman_decode,
+    search_collection,
+    similar_documents
 )
 from .serializers import (
     CollectionsCreateSerializer,
@@ -24,25 +48,350 @@ from .serializers import (
     DocumentListSerializer,
     DocumentDetailSerializer,
     DocumentCreateSerializer,
+    DocumentBulkCreateSerializer,
     StatisticsSerializer,
-    CollectionStatisticsSerializer
+    StatisticsJobSerializer,
+    HuffmanDecodeSerializer,
+    SearchSerializer,
+    SimilarDocumentsSerializer,
+    CollectionStatisticsSerializer,
+    collections_statistics_json,
+    statistics_json
 )
 from users.permissions import IsOwner
 
 
+# Поля коллекции, необходимые для расчета статистики и поиска
+COLLECTION_STATISTICS_FIELDS = (
+    'id', 'name', 'documents_count', 'total_words', 'version',
+    'stop_words', 'stemming', 'min_word_length'
+)
+# Поля документа, необходимые для расчета статистики по предрассчитанному
+# вектору частот (без содержимого)
+DOCUMENT_STATISTICS_FIELDS = ('id', 'term_ids', 'term_counts', 'words_count')
+# Поля документа, необходимые для кодирования Хаффмана: содержимое
+# загружается только при промахе кеша
+DOCUMENT_HUFFMAN_FIELDS = ('id', 'content_hash')
+
+
 class OwnerViewSet(ModelViewSet):
     """Базовый ViewSet для объектов, принадлежащих пользователю."""
     permission_classes = (IsOwner,)
 
+    # Действия, для которых измеряются время рендеринга и размер ответа
+    tracked_actions = {}
+
+    # Поля, загружаемые из БД для действий; для остальных - все поля
+    action_fields = {}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        endpoint = self.tracked_actions.get(self.action)
+        if endpoint and isinstance(response, Response):
+            with aggregator.stage(endpoint, 'render'):
+                response.render()
+            aggregator.observe('response_bytes', endpoint, len(response.content))
+        return response
+
     def get_queryset(self):
         if not self.request.user.is_authenticated:
             return self.queryset.none()
-        return self.queryset.filter(owner=self.request.user)
+        queryset = self.queryset.filter(owner=self.request.user)
+        fields = self.action_fields.get(self.action)
+        if fields:
+            queryset = queryset.only('owner', *fields)
+        return queryset
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
 
+ORDER_BY_PARAMETER = openapi.Parameter(
+    'order_by',
+    openapi.IN_QUERY,
+    description=(
+        "Ключ сортировки слов: tf, idf или tfidf; "
+        "префикс '-' - по убыванию (по умолчанию tf)"
+    ),
+    type=openapi.TYPE_STRING
+)
+
+ASYNC_PARAMETER = openapi.Parameter(
+    'async',
+    openapi.IN_QUERY,
+    description=(
+        "1 - рассчитать статистику в фоне: если она еще не готова, "
+        "возвращается 202 с id задания"
+    ),
+    type=openapi.TYPE_STRING
+)
+
+# Форматы результата кодирования Хаффмана
+HUFFMAN_OUTPUTS = ('text', 'base64', 'binary')
+# Длина таблицы кодов в начале ответа в формате binary
+HUFFMAN_TABLE_LENGTH = struct.Struct('>I')
+
+HUFFMAN_OUTPUT_PARAMETER = openapi.Parameter(
+    'output',
+    openapi.IN_QUERY,
+    description=(
+        "Формат результата: text - строка из '0'/'1' (по умолчанию), "
+        "base64 - упакованные биты в base64, binary - упакованные биты "
+        "как application/octet-stream: длина таблицы кодов (4 байта, "
+        "big-endian), таблица кодов в JSON и упакованные биты, количество "
+        "бит - в заголовке X-Huffman-Bit-Length"
+    ),
+    type=openapi.TYPE_STRING
+)
+
+HUFFMAN_CANONICAL_PARAMETER = openapi.Parameter(
+    'canonical',
+    openapi.IN_QUERY,
+    description=(
+        "1 - канонические коды длиной не более 15 бит: вместо словаря "
+        "codes возвращается canonical_codes - символы для каждой длины кода"
+    ),
+    type=openapi.TYPE_STRING
+)
+
+SEARCH_QUERY_PARAMETER = openapi.Parameter(
+    'q',
+    openapi.IN_QUERY,
+    description="Поисковый запрос",
+    type=openapi.TYPE_STRING,
+    required=True
+)
+
+SEARCH_LIMIT_PARAMETER = openapi.Parameter(
+    'k',
+    openapi.IN_QUERY,
+    description=(
+        "Количество документов в результате (по умолчанию 10, не более 100)"
+    ),
+    type=openapi.TYPE_INTEGER
+)
+
+SIMILAR_COLLECTION_PARAMETER = openapi.Parameter(
+    'collection',
+    openapi.IN_QUERY,
+    description="id коллекции, среди документов которой ищутся похожие",
+    type=openapi.TYPE_INTEGER,
+    required=True
+)
+
+# Список файлов не выводится drf_yasg из сериализатора, поэтому параметры
+# формы пакетной загрузки описываются явно
+BULK_UPLOAD_PARAMETERS = [
+    openapi.Parameter(
+        'files',
+        openapi.IN_FORM,
+        description="Текстовые файлы .txt или архивы .zip/.tar с ними",
+        type=openapi.TYPE_ARRAY,
+        items=openapi.Items(type=openapi.TYPE_FILE),
+        collection_format='multi',
+        required=True
+    ),
+    openapi.Parameter(
+        'collection',
+        openapi.IN_FORM,
+        description="id коллекции, в которую добавляются документы",
+        type=openapi.TYPE_INTEGER,
+        required=False
+    ),
+]
+
+
+def parse_statistics_order(query_params):
+    """
+    Возвращает ключ и направление сортировки статистики из параметров запроса.
+
+    Returns:
+        tuple: (ключ, по убыванию) или None, если ключ некорректен
+    """
+    order_by = query_params.get('order_by', 'tf')
+    key = order_by.removeprefix('-')
+    if key not in STATISTICS_ORDER_KEYS:
+        return None
+    return key, order_by.startswith('-')
+
+
+def parse_results_limit(query_params):
+    """
+    Возвращает количество документов в результате из параметра k.
+
+    Returns:
+        int: количество документов или None, если значение некорректно
+    """
+    try:
+        k = int(query_params.get('k', settings.SEARCH_RESULTS))
+    except ValueError:
+        return None
+    if not 1 <= k <= settings.SEARCH_MAX_RESULTS:
+        return None
+    return k
+
+
+def collection_statistics_data(request, collection, order, run_async=False):
+    """
+    Рассчитывает статистику по коллекции для ответа.
+
+    Используется синхронным и асинхронным представлениями.
+
+    Returns:
+        tuple: (данные, код ответа, заголовки)
+    """
+    if not collection.documents_count:
+        return (
+            {"error": "Collection is empty"},
+            status.HTTP_400_BAD_REQUEST,
+            None
+        )
+
+    key, descending = order
+    if run_async:
+        stats, job = enqueue_collection_statistics(
+            collection,
+            settings.DISPLAYED_WORDS,
+            key=key,
+            reverse=descending
+        )
+        if stats is None:
+            location = reverse(
+                'api:statistics-job',
+                kwargs={'pk': job.id},
+                request=request
+            )
+            return (
+                {"job_id": job.id, "status": job.status},
+                status.HTTP_202_ACCEPTED,
+                {'Location': location}
+            )
+    else:
+        stats = cached_collection_tfidf(
+            collection,
+            settings.DISPLAYED_WORDS,
+            key=key,
+            reverse=descending
+        )
+    with aggregator.stage(CollectionMetrics.endpoint, 'serialize'):
+        data = statistics_json(stats)
+    return data, status.HTTP_200_OK, None
+
+
+def document_statistics_data(document, collections, order):
+    """
+    Рассчитывает статистику по документу для ответа.
+
+    Используется синхронным и асинхронным представлениями.
+    """
+    key, descending = order
+    stats_by_collection = cached_document_tfidf(
+        document,
+        collections,
+        settings.DISPLAYED_WORDS,
+        key=key,
+        reverse=descending
+    )
+    with aggregator.stage(DocumentMetrics.endpoint, 'serialize'):
+        return collections_statistics_json(
+            (collection, stats_by_collection[collection.id])
+            for collection in collections
+        )
+
+
+def huffman_codes_data(codes, canonical=False):
+    """
+    Возвращает словарь кодов для ответа.
+
+    Канонические коды передаются компактно - символами каждой длины кода
+    (см. canonical_table).
+    """
+    if canonical:
+        return {'canonical_codes': canonical_table(codes)}
+    return {'codes': codes}
+
+
+def huffman_etag(document, output, canonical):
+    """
+    Возвращает ETag результата кодирования документа.
+
+    Содержимое документа не меняется после загрузки, поэтому результат
+    определяется хешем содержимого, параметрами и версией приложения.
+    """
+    variant = 'canonical' if canonical else 'codes'
+    return f'"{document.content_hash}-{output}-{variant}-{VERSION}"'
+
+
+def etag_matches(request, etag):
+    """Проверяет, есть ли ETag в заголовке If-None-Match запроса."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    return any(
+        tag == '*' or tag.removeprefix('W/') == etag
+        for tag in parse_etags(header)
+    )
+
+
+def huffman_data(document, output='text', canonical=False):
+    """
+    Кодирует содержимое документа кодом Хаффмана для ответа.
+
+    Используется синхронным и асинхронным представлениями.
+
+    Args:
+        document: Документ
+        output: 'text' - строка из символов '0'/'1', 'base64' - упакованные
+            биты в base64 с их количеством
+        canonical: вернуть канонические коды с длиной не более
+            MAX_CODE_LENGTH бит в виде длин кодов
+    """
+    with aggregator.stage('document_huffman', 'encode'):
+        data, bit_length, codes = cached_huffman_encoding(
+            document, MAX_CODE_LENGTH if canonical else None
+        )
+
+    if output == 'text':
+        return {
+            'encoded_text': bytes_to_bits(data, bit_length),
+            **huffman_codes_data(codes, canonical)
+        }
+    return {
+        'encoded': base64.b64encode(data).decode('ascii'),
+        'bit_length': bit_length,
+        **huffman_codes_data(codes, canonical)
+    }
+
+
+def huffman_binary_response(document, canonical=False):
+    """
+    Возвращает упакованные биты кода Хаффмана как application/octet-stream.
+
+    Тело ответа: длина таблицы кодов в байтах (HUFFMAN_TABLE_LENGTH),
+    таблица кодов в JSON ({"codes": ...} или {"canonical_codes": ...})
+    и упакованные биты. Таблица передается в теле, а не в заголовке:
+    словарь кодов большого алфавита не помещается в буфер заголовков
+    прокси. Количество значащих бит передается в заголовке
+    X-Huffman-Bit-Length.
+    """
+    with aggregator.stage('document_huffman', 'encode'):
+        data, bit_length, codes = cached_huffman_encoding(
+            document, MAX_CODE_LENGTH if canonical else None
+        )
+
+    table = json.dumps(
+        huffman_codes_data(codes, canonical),
+        ensure_ascii=False
+    ).encode()
+    return HttpResponse(
+        HUFFMAN_TABLE_LENGTH.pack(len(table)) + table + data,
+        content_type='application/octet-stream',
+        headers={'X-Huffman-Bit-Length': str(bit_length)}
+    )
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def check_status(request):
@@ -54,20 +403,24 @@ def check_status(request):
 @permission_classes([AllowAny])
 def metrics(request):
     """Возвращает метрики системы."""
+    aggregator.flush()
     doc_metrics, _ = DocumentMetrics.objects.get_or_create(pk=1)
     coll_metrics, _ = CollectionMetrics.objects.get_or_create(pk=1)
 
-    total_documents = Document.objects.count()
-    total_collections = Collections.objects.count()
+    row_counts = cached_row_counts()
+    total_documents = row_counts['documents']
+    total_collections = row_counts['collections']
     avg_docs_per_collection = (
         total_documents / total_collections if total_collections > 0 else 0
     )
 
     doc_metrics_dict = doc_metrics.to_dict()
     doc_metrics_dict['total_documents'] = total_documents
+    doc_metrics_dict['latency'] = latency_summary(DocumentMetrics.endpoint)
 
     coll_metrics_dict = coll_metrics.to_dict()
     coll_metrics_dict['avg_documents_per_collection'] = round(avg_docs_per_collection, 3)
+    coll_metrics_dict['latency'] = latency_summary(CollectionMetrics.endpoint)
 
     return Response({
         "document_metrics": doc_metrics_dict,
@@ -75,6 +428,78 @@ def metrics(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def metrics_prometheus(request):
+    """Возвращает метрики системы в текстовом формате Prometheus."""
+    aggregator.flush()
+    return HttpResponse(
+        render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+@swagger_auto_schema(
+    method='get',
+    operation_description="Возвращает состояние задания на расчет статистики",
+    responses={
+        200: "Статистика рассчитана или расчет завершился ошибкой",
+        202: "Задание ожидает выполнения",
+        404: "Задание не найдено"
+    },
+    security=[{'Bearer': []}]
+)
+@api_view(['GET'])
+def statistics_job(request, pk):
+    """Возвращает состояние и результат задания на расчет статистики."""
+    job = get_object_or_404(
+        StatisticsJob,
+        pk=pk,
+        collection__owner=request.user
+    )
+    in_progress = job.status in (
+        StatisticsJob.Status.PENDING,
+        StatisticsJob.Status.RUNNING
+    )
+    response_status = (
+        status.HTTP_202_ACCEPTED if in_progress else status.HTTP_200_OK
+    )
+    return Response(
+        StatisticsJobSerializer(job).data,
+        status=response_status
+    )
+
+
+@swagger_auto_schema(
+    method='post',
+    operation_description=(
+        "Декодирует код Хаффмана: строку бит encoded_text или упакованные "
+        "биты encoded (base64) с количеством бит bit_length и словарь кодов "
+        "codes или канонические коды canonical_codes"
+    ),
+    request_body=HuffmanDecodeSerializer,
+    responses={
+        200: "Текст успешно декодирован",
+        400: "Некорректные данные или коды"
+    },
+    security=[{'Bearer': []}]
+)
+@api_view(['POST'])
+def decode_huffman(request):
+    """Декодирует код Хаффмана."""
+    serializer = HuffmanDecodeSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        with aggregator.stage('huffman_decode', 'decode'):
+            text = huffman_decode(**serializer.validated_data)
+    except ValueError as error:
+        return Response(
+            {"error": str(error)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({'text': text})
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def version(request):
@@ -86,6 +511,15 @@ class CollectionViewSet(OwnerViewSet):
     """Представление для коллекций документов."""
     queryset = Collections.objects.all()
     http_method_names = ('get', 'post', 'delete')
+    tracked_actions = {
+        'get_collection_statistics': CollectionMetrics.endpoint,
+    }
+    action_fields = {
+        'get_collection_statistics': COLLECTION_STATISTICS_FIELDS,
+        'search': COLLECTION_STATISTICS_FIELDS,
+        'create_document': ('id',),
+        'destroy_document': ('id',),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -95,27 +529,68 @@ class CollectionViewSet(OwnerViewSet):
     @swagger_auto_schema(
         operation_description="Возвращает статистику по коллекции",
         responses={
-            200: "Статистика успешно получена",
-            400: "Коллекция пуста"
+            200: openapi.Response(
+                "Статистика успешно получена",
+                StatisticsSerializer
+            ),
+            202: "Задание на расчет статистики поставлено в очередь",
+            400: "Коллекция пуста или некорректный order_by"
         },
+        manual_parameters=[ORDER_BY_PARAMETER, ASYNC_PARAMETER],
         security=[{'Bearer': []}],
         operation_id='collection_statistics'
     )
     def get_collection_statistics(self, request, pk=None):
         """Возвращает статистику по коллекции."""
+        order = parse_statistics_order(request.query_params)
+        if order is None:
+            return Response(
+                {"error": "Invalid order_by"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         collection = self.get_object()
-        documents = collection.documents.all()
-        if not documents:
+        data, response_status, headers = collection_statistics_data(
+            request,
+            collection,
+            order,
+            request.query_params.get('async') in ('1', 'true')
+        )
+        return Response(data, status=response_status, headers=headers)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Ищет документы коллекции по запросу и возвращает наиболее "
+            "релевантные по сумме TF-IDF слов запроса"
+        ),
+        responses={
+            200: "Результаты поиска",
+            400: "Пустой запрос или некорректный k"
+        },
+        manual_parameters=[SEARCH_QUERY_PARAMETER, SEARCH_LIMIT_PARAMETER],
+        security=[{'Bearer': []}],
+        operation_id='collection_search'
+    )
+    def search(self, request, pk=None):
+        """Ищет документы коллекции по запросу."""
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {"error": "Query is empty"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        k = parse_results_limit(request.query_params)
+        if k is None:
             return Response(
-                {"error": "Collection is empty"},
+                {"error": "Invalid k"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        texts = [doc.content for doc in documents]
-        stats = calculate_collection_tfidf(texts)
-        sorted_stats = sorted(stats, key=lambda x: x['tf'])[:settings.DISPLAYED_WORDS]
-        serializer = StatisticsSerializer({'statistics': sorted_stats})
-        return Response(serializer.data)
+        collection = self.get_object()
+        results = search_collection(collection, query, k)
+        return Response(
+            SearchSerializer({'query': query, 'results': results}).data
+        )
 
     @swagger_auto_schema(
         operation_description="Добавляет документ в коллекцию",
@@ -128,16 +603,14 @@ class CollectionViewSet(OwnerViewSet):
     )
     def create_document(self, request, pk=None, document_id=None):
         """Добавляет документ в коллекцию."""
-        try:
-            collection = self.get_object()
-            document = Document.objects.get(id=document_id)
-            collection.documents.add(document)
-            return Response(status=status.HTTP_200_OK)
-        except Document.DoesNotExist:
+        collection = self.get_object()
+        if not Document.objects.filter(id=document_id).exists():
             return Response(
                 {"error": "Document not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        collection.documents.add(document_id)
+        return Response(status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_description="Удаляет документ из коллекции",
@@ -150,16 +623,14 @@ class CollectionViewSet(OwnerViewSet):
     )
     def destroy_document(self, request, pk=None, document_id=None):
         """Удаляет документ из коллекции."""
-        try:
-            collection = self.get_object()
-            document = Document.objects.get(id=document_id)
-            collection.documents.remove(document)
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        except Document.DoesNotExist:
+        collection = self.get_object()
+        if not Document.objects.filter(id=document_id).exists():
             return Response(
                 {"error": "Document not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        collection.documents.remove(document_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class DocumentViewSet(OwnerViewSet):
@@ -167,66 +638,175 @@ class DocumentViewSet(OwnerViewSet):
     queryset = Document.objects.all()
     parser_classes = (MultiPartParser, FormParser)
     http_method_names = ('get', 'post', 'delete')
+    tracked_actions = {
+        'get_document_statistics': DocumentMetrics.endpoint,
+        'get_huffman': 'document_huffman',
+    }
+    action_fields = {
+        'list': ('id', 'title'),
+        'destroy': ('id',),
+        'get_document_statistics': DOCUMENT_STATISTICS_FIELDS,
+        'similar': DOCUMENT_STATISTICS_FIELDS,
+        'get_huffman': DOCUMENT_HUFFMAN_FIELDS,
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
             return DocumentCreateSerializer
+        elif self.action == 'bulk_upload':
+            return DocumentBulkCreateSerializer
         elif self.action == 'list':
             return DocumentListSerializer
         return DocumentDetailSerializer
 
+    @swagger_auto_schema(
+        operation_description=(
+            "Загружает несколько документов из файлов .txt или архивов "
+            ".zip/.tar и при необходимости добавляет их в коллекцию"
+        ),
+        responses={
+            201: "Документы загружены, для каждого файла возвращается id или ошибка",
+            400: "Ни один файл не загружен или коллекция не найдена"
+        },
+        request_body=no_body,
+        manual_parameters=BULK_UPLOAD_PARAMETERS,
+        security=[{'Bearer': []}],
+        operation_id='documents_bulk_upload'
+    )
+    def bulk_upload(self, request):
+        """Загружает несколько документов."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        created = any('id' in result for result in results)
+        return Response(
+            {'documents': results},
+            status=(
+                status.HTTP_201_CREATED if created
+                else status.HTTP_400_BAD_REQUEST
+            )
+        )
+
     @swagger_auto_schema(
         operation_description="Возвращает статистику по документу",
         responses={
-            200: "Статистика успешно получена",
-            400: "Документ не находится ни в одной коллекции"
+            200: openapi.Response(
+                "Статистика успешно получена",
+                CollectionStatisticsSerializer(many=True)
+            ),
+            400: "Документ не находится ни в одной коллекции или некорректный order_by"
         },
+        manual_parameters=[ORDER_BY_PARAMETER],
         security=[{'Bearer': []}],
         operation_id='document_statistics'
     )
     def get_document_statistics(self, request, pk=None):
         """Возвращает статистику по документу."""
+        order = parse_statistics_order(request.query_params)
+        if order is None:
+            return Response(
+                {"error": "Invalid order_by"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         document = self.get_object()
-        collections = document.collections.all()
+        collections = list(
+            document.collections.only(*COLLECTION_STATISTICS_FIELDS)
+        )
         if not collections:
             return Response(
                 {"error": "Document is not in any collection"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        collections_stats = []
-        for collection in collections:
-            texts = [doc.content for doc in collection.documents.all()]
-            stats = calculate_document_tfidf(document.content, texts)
-            sorted_stats = sorted(stats, key=lambda x: x['tf'])[:settings.DISPLAYED_WORDS]
-
-            collections_stats.append({
-                'collection_id': collection.id,
-                'collection_name': collection.name or f"Collection {collection.id}",
-                'statistics': sorted_stats
-            })
-
-        serializer = CollectionStatisticsSerializer(
-            collections_stats,
-            many=True
+        return Response(
+            document_statistics_data(document, collections, order)
         )
-        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Возвращает документы коллекции, наиболее похожие на документ "
+            "по косинусному сходству TF-IDF векторов"
+        ),
+        responses={
+            200: "Похожие документы",
+            400: "Некорректный collection или k",
+            404: "Документ или коллекция не найдены"
+        },
+        manual_parameters=[
+            SIMILAR_COLLECTION_PARAMETER,
+            SEARCH_LIMIT_PARAMETER
+        ],
+        security=[{'Bearer': []}],
+        operation_id='document_similar'
+    )
+    def similar(self, request, pk=None):
+        """Возвращает документы коллекции, похожие на документ."""
+        try:
+            collection_id = int(request.query_params['collection'])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Invalid collection"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        k = parse_results_limit(request.query_params)
+        if k is None:
+            return Response(
+                {"error": "Invalid k"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        document = self.get_object()
+        collection = get_object_or_404(
+            Collections.objects.only(*COLLECTION_STATISTICS_FIELDS),
+            pk=collection_id,
+            owner=request.user
+        )
+        results = similar_documents(document, collection, k)
+        return Response(SimilarDocumentsSerializer({
+            'document_id': document.id,
+            'collection_id': collection.id,
+            'results': results
+        }).data)
 
     @swagger_auto_schema(
         operation_description="Возвращает содержимое документа, закодированное кодом Хаффмана",
         responses={
             200: "Документ успешно закодирован",
+            304: "Результат не изменился (совпал ETag из If-None-Match)",
+            400: "Некорректный output",
             404: "Документ не найден"
         },
+        manual_parameters=[
+            HUFFMAN_OUTPUT_PARAMETER,
+            HUFFMAN_CANONICAL_PARAMETER
+        ],
         security=[{'Bearer': []}],
         operation_id='document_huffman'
     )
     def get_huffman(self, request, pk=None):
         """Возвращает содержимое документа, закодированное кодом Хаффмана."""
-        document = self.get_object()
-        encoded_text, codes = huffman_encode(document.content)
+        output = request.query_params.get('output', 'text')
+        if output not in HUFFMAN_OUTPUTS:
+            return Response(
+                {"error": "Invalid output"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with aggregator.stage('document_huffman', 'db_fetch'):
+            document = self.get_object()
+
+        canonical = request.query_params.get('canonical') in ('1', 'true')
+        etag = huffman_etag(document, output, canonical)
+        if etag_matches(request, etag):
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED,
+                headers={'ETag': etag}
+            )
 
-        return Response({
-            'encoded_text': encoded_text,
-            'codes': codes
-        })
+        if output == 'binary':
+            response = huffman_binary_response(document, canonical)
+        else:
+            response = Response(huffman_data(document, output, canonical))
+        response['ETag'] = etag
+        return response
@@ -0,0 +1,107 @@
+"""
+Вспомогательные функции для команд замера производительности (benchmark_*).
+"""
+from array import array
+from collections import Counter
+import random
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from .constants import VECTOR_TYPECODE
+from .models import Collections, Document
+from .services import build_term_vectors
+
+
+def synthetic_texts(count, length, vocabulary, seed=0):
+    """
+    Генерирует тексты из случайных слов.
+
+    Частоты слов распределены по закону Ципфа, как в текстах на
+    естественном языке.
+
+    Args:
+        count: количество текстов
+        length: количество слов в тексте
+        vocabulary: размер словаря
+    """
+    rng = random.Random(seed)
+    words = [f'слово{index}' for index in range(vocabulary)]
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    for _ in range(count):
+        yield ' '.join(rng.choices(words, weights, k=length))
+
+
+def synthetic_vectors(count, length, vocabulary, seed=0):
+    """
+    Генерирует упакованные векторы документов без обращения к БД.
+
+    Векторы имеют формат, который принимают движки расчета:
+    кортежи (term_ids, term_counts, words_count). Частоты слов
+    распределены по закону Ципфа, как в synthetic_texts.
+    """
+    rng = random.Random(seed)
+    term_ids = range(1, vocabulary + 1)
+    weights = [1 / rank for rank in term_ids]
+    for _ in range(count):
+        word_counts = Counter(rng.choices(term_ids, weights, k=length))
+        yield (
+            array(VECTOR_TYPECODE, word_counts.keys()).tobytes(),
+            array(VECTOR_TYPECODE, word_counts.values()).tobytes(),
+            length,
+        )
+
+
+def best_time(func, repeat=3):
+    """Возвращает наименьшее время выполнения func из repeat запусков, секунды."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def peak_memory(func):
+    """Возвращает пиковый объем памяти, выделенной при выполнении func, байты."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def create_synthetic_collection(size, length, vocabulary, batch_size=1000):
+    """
+    Создает коллекцию из size синтетических документов.
+
+    Индекс коллекции не строится. Вызывается внутри транзакции, которую
+    команда затем откатывает.
+    """
+    owner = get_user_model().objects.create(
+        username=f'benchmark-{uuid.uuid4().hex[:12]}'
+    )
+    collection = Collections.objects.create(name='benchmark', owner=owner)
+    texts = synthetic_texts(size, length, vocabulary)
+    while True:
+        batch = [text for _, text in zip(range(batch_size), texts)]
+        if not batch:
+            break
+        with transaction.atomic():
+            documents = Document.objects.bulk_create([
+                Document(title='benchmark', content=text, owner=owner, **vector)
+                for text, vector in zip(batch, build_term_vectors(batch))
+            ])
+            Document.collections.through.objects.bulk_create([
+                Document.collections.through(
+                    document_id=document.pk,
+                    collections_id=collection.pk
+                )
+                for document in documents
+            ])
+    return collection
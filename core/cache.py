@@ -0,0 +1,113 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from .constants import VECTOR_TYPECODE, VERSION
+
+
+def statistics_cache_key(*parts):
+    """
+    Формирует ключ кеша статистики из составных частей.
+
+    Ключ включает версию приложения, так как формат кешируемых объектов
+    может меняться между версиями.
+    """
+    return f'statistics:{VERSION}:' + ':'.join(str(part) for part in parts)
+
+
+def pack_mapping(mapping, typecode):
+    """
+    Упаковывает словарь {id: число} в массивы ключей и значений,
+    отсортированные по ключу.
+
+    Массивы хранятся в кеше компактнее словаря, значение по ключу ищется
+    двоичным поиском (см. packed_get).
+
+    Args:
+        mapping: Словарь с целыми неотрицательными ключами
+        typecode: Тип элементов массива значений
+    """
+    keys = array(VECTOR_TYPECODE, sorted(mapping))
+    return keys, array(typecode, map(mapping.__getitem__, keys))
+
+
+def packed_get(packed, key, default=None):
+    """Возвращает значение по ключу из результата pack_mapping."""
+    keys, values = packed
+    index = bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        return values[index]
+    return default
+
+
+def pack_groups(groups):
+    """
+    Упаковывает словарь {id: список id} в массивы ключей, границ групп и
+    элементов всех групп подряд.
+    """
+    keys = array(VECTOR_TYPECODE, sorted(groups))
+    offsets = array(VECTOR_TYPECODE, [0])
+    items = array(VECTOR_TYPECODE)
+    for key in keys:
+        items.extend(groups[key])
+        offsets.append(len(items))
+    return keys, offsets, items
+
+
+def packed_group(packed, key):
+    """Возвращает группу по ключу из результата pack_groups."""
+    keys, offsets, items = packed
+    index = bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        return items[offsets[index]:offsets[index + 1]]
+    return ()
+
+
+class SizeLimitedCache:
+    """
+    Кеш в памяти процесса, ограниченный суммарным размером значений.
+
+    В отличие от кеша Django, вытесняющего записи по их количеству,
+    учитывает размер каждой записи: при превышении лимита вытесняются
+    давно не использованные записи, а записи больше лимита не сохраняются.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Возвращает значение по ключу или None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, size):
+        """
+        Сохраняет значение.
+
+        Args:
+            size: размер значения в байтах
+        """
+        if size > self.max_size:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        """Очищает кеш."""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
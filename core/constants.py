@@ -1 +1,16 @@
-VERSION = "0.5.6"
+VERSION = "0.23.1"
+
+# Тип элементов упакованных векторов документа (беззнаковое 32-битное)
+VECTOR_TYPECODE = 'I'
+
+# Границы корзин гистограммы времени обработки запросов, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Границы корзин размера коллекции, количество документов
+COLLECTION_SIZE_BUCKETS = (10, 100, 1000, 10000)
+
+# Границы корзин гистограммы размера ответа, байты
+RESPONSE_SIZE_BUCKETS = (1024, 10240, 102400, 1048576, 10485760)
+
+# Расширения архивов tar, принимаемых при пакетной загрузке документов
+TAR_EXTENSIONS = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
@@ -1,44 +1,40 @@
 import time
-from django.utils import timezone
 from functools import wraps
+from .metrics import aggregator
 
 
 class metrics_decorator:
     """
     Декоратор для отслеживания времени обработки и сохранения метрик.
 
+    Метрики накапливаются в памяти процесса и периодически сбрасываются
+    в БД (см. core.metrics.MetricsAggregator).
+
     Args:
         metrics_model: Модель метрик (DocumentMetrics или CollectionMetrics)
+        collection_size: Функция, возвращающая размер коллекции по аргументам
+            декорируемой функции, для разбивки гистограммы времени обработки
     """
-    def __init__(self, metrics_model):
+    def __init__(self, metrics_model, collection_size=None):
         self.metrics_model = metrics_model
+        self.collection_size = collection_size
 
     def __call__(self, func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_time = time.perf_counter()
             result = func(*args, **kwargs)
-            end_time = time.time()
-            execution_time = end_time - start_time
-
-            metrics, created = self.metrics_model.objects.get_or_create(pk=1)
-
-            metrics.statistics_requests += 1
-            metrics.latest_statistics_processed_timestamp = timezone.now()
-
-            if metrics.min_time_processed == 0 or (
-                execution_time < metrics.min_time_processed
-            ):
-                metrics.min_time_processed = execution_time
-
-            if execution_time > metrics.max_time_processed:
-                metrics.max_time_processed = execution_time
-
-            metrics.total_time_processed += execution_time
-            metrics.avg_time_processed = (
-                metrics.total_time_processed / metrics.statistics_requests
+            execution_time = time.perf_counter() - start_time
+
+            aggregator.record(
+                self.metrics_model,
+                execution_time,
+                collection_size=(
+                    self.collection_size(*args, **kwargs)
+                    if self.collection_size
+                    else None
+                )
             )
-            metrics.save()
 
             return result
         return wrapper
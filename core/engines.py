@@ -0,0 +1,143 @@
+from array import array
+from collections import Counter
+from itertools import islice
+import math
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from .constants import VECTOR_TYPECODE
+
+
+class PythonEngine:
+    """Расчет частот и TF-IDF на чистом Python."""
+
+    def accumulate(self, vectors):
+        """
+        Суммирует упакованные векторы документов.
+
+        Args:
+            vectors: Итерируемый объект кортежей
+                (term_ids, term_counts, words_count)
+
+        Returns:
+            tuple: (частоты слов, документные частоты,
+                число документов, число слов)
+        """
+        term_counts = Counter()
+        doc_freq = Counter()
+        total_docs = 0
+        total_words = 0
+        for term_ids, counts, words_count in vectors:
+            ids = array(VECTOR_TYPECODE)
+            ids.frombytes(term_ids)
+            values = array(VECTOR_TYPECODE)
+            values.frombytes(counts)
+            term_counts.update(dict(zip(ids, values)))
+            doc_freq.update(ids)
+            total_docs += 1
+            total_words += words_count
+
+        return dict(term_counts), dict(doc_freq), total_docs, total_words
+
+    def tf(self, term_freqs, total_words):
+        """Рассчитывает TF для списка частот слов."""
+        return [term_freq / total_words for term_freq in term_freqs]
+
+    def idf(self, doc_freqs, total_docs):
+        """Рассчитывает IDF для списка документных частот."""
+        return [math.log(total_docs / doc_freq) for doc_freq in doc_freqs]
+
+
+class NumpyEngine:
+    """
+    Векторизованный расчет частот и TF-IDF на NumPy.
+
+    Векторы документов объединяются порциями в разреженную матрицу
+    документ-слово в формате COO, частоты слов и документные частоты
+    считаются суммами по ее столбцам и добавляются к суммам предыдущих
+    порций. Результаты побитово совпадают с PythonEngine: деление
+    целых чисел округляется одинаково, а логарифм считается math.log.
+    """
+
+    def __init__(self):
+        try:
+            import numpy
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                'Для TFIDF_ENGINE=numpy требуется пакет numpy'
+            ) from error
+        self.np = numpy
+        self.dtype = numpy.dtype(VECTOR_TYPECODE)
+
+    def accumulate(self, vectors):
+        """Суммирует упакованные векторы документов (см. PythonEngine)."""
+        np = self.np
+        terms = np.empty(0, dtype=self.dtype)
+        term_counts = np.empty(0, dtype=np.int64)
+        doc_freq = np.empty(0, dtype=np.int64)
+        total_docs = 0
+        total_words = 0
+        vectors = iter(vectors)
+        # Векторы обрабатываются порциями по STATISTICS_CHUNK_SIZE документов,
+        # суммы порции добавляются к накопленным, поэтому память зависит от
+        # размера словаря и порции, а не от общего числа записей
+        while batch := list(islice(vectors, settings.STATISTICS_CHUNK_SIZE)):
+            ids_parts = [terms]
+            counts_parts = [term_counts]
+            for term_ids, counts, words_count in batch:
+                ids_parts.append(np.frombuffer(term_ids, dtype=self.dtype))
+                counts_parts.append(np.frombuffer(counts, dtype=self.dtype))
+                total_words += words_count
+            total_docs += len(batch)
+
+            # Столбцы матрицы - id слов, каждый документ дает по одной записи
+            # на слово, поэтому число записей в столбце - документная частота
+            ids = np.concatenate(ids_parts)
+            freqs = np.ones(len(ids), dtype=np.int64)
+            freqs[:len(terms)] = doc_freq
+            counts = np.concatenate(counts_parts).astype(np.int64, copy=False)
+            terms, columns = np.unique(ids, return_inverse=True)
+            term_counts = np.zeros(len(terms), dtype=np.int64)
+            np.add.at(term_counts, columns, counts)
+            doc_freq = np.zeros(len(terms), dtype=np.int64)
+            np.add.at(doc_freq, columns, freqs)
+
+        terms = terms.tolist()
+        return (
+            dict(zip(terms, term_counts.tolist())),
+            dict(zip(terms, doc_freq.tolist())),
+            total_docs,
+            total_words,
+        )
+
+    def tf(self, term_freqs, total_words):
+        """Рассчитывает TF для списка частот слов."""
+        np = self.np
+        return (np.asarray(term_freqs, dtype=np.float64) / total_words).tolist()
+
+    def idf(self, doc_freqs, total_docs):
+        """Рассчитывает IDF для списка документных частот."""
+        np = self.np
+        ratios = total_docs / np.asarray(doc_freqs, dtype=np.float64)
+        # np.log может отличаться от math.log в последнем знаке и менять
+        # порядок слов с равным TF-IDF, поэтому логарифм считается
+        # math.log - по одному разу для каждой различной документной частоты
+        ratios, positions = np.unique(ratios, return_inverse=True)
+        logs = np.array([math.log(ratio) for ratio in ratios.tolist()])
+        return logs[positions].tolist()
+
+
+ENGINES = {
+    'python': PythonEngine,
+    'numpy': NumpyEngine,
+}
+
+
+def get_engine():
+    """Возвращает движок расчета, выбранный настройкой TFIDF_ENGINE."""
+    try:
+        engine_class = ENGINES[settings.TFIDF_ENGINE]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f'Неизвестный TFIDF_ENGINE: {settings.TFIDF_ENGINE}'
+        )
+    return engine_class()
@@ -0,0 +1,463 @@
+# Модуль не зависит от Django, как и core/tokenizer.py
+
+# Размер части текста, кодируемой за один шаг pack_bits, в символах
+PACK_CHUNK_SIZE = 65536
+
+# Максимальная длина кода для канонических кодов с ограниченной длиной
+MAX_CODE_LENGTH = 15
+
+# Максимальное количество символов в таблице кодов, принимаемой декодером:
+# столько символов вмещают коды длиной не более MAX_CODE_LENGTH
+MAX_CODES = 2 ** MAX_CODE_LENGTH
+
+# Максимальная длина кода, принимаемого декодером. Символ с кодом длины d
+# встречается в тексте из не менее F(d + 2) символов (числа Фибоначчи),
+# поэтому для текстов короче 2 ** 32 символов длина кода не превышает 45
+MAX_DECODE_CODE_LENGTH = 48
+
+
+class HuffmanNode:
+    """Узел дерева Хаффмана."""
+    def __init__(self, char=None, freq=0):
+        self.char = char
+        self.freq = freq
+        self.left = None
+        self.right = None
+
+    def __lt__(self, other):
+        return self.freq < other.freq
+
+    def __str__(self):
+        return f"({self.char}, {self.freq})"
+
+
+def counting_sort(nodes):
+    """
+    Сортировка подсчетом для списка HuffmanNode по частоте (freq).
+    """
+    if not nodes:
+        return []
+
+    max_freq = max(node.freq for node in nodes)
+    count = [0] * (max_freq + 1)
+
+    for node in nodes:
+        count[node.freq] += 1
+
+    for i in range(1, len(count)):
+        count[i] += count[i - 1]
+
+    result = [None] * len(nodes)
+
+    for node in reversed(nodes):
+        count[node.freq] -= 1
+        result[count[node.freq]] = node
+
+    return result
+
+
+def build_huffman_tree(text):
+    """Создает дерево Хаффмана из текста."""
+    if not text:
+        return None
+
+    freq_dict = {}
+    for char in text:
+        freq_dict[char] = freq_dict.get(char, 0) + 1
+
+    if len(freq_dict) == 1:
+        char = list(freq_dict.keys())[0]
+        return HuffmanNode(char=char, freq=freq_dict[char])
+
+    nodes = [HuffmanNode(char=char, freq=freq) 
+             for char, freq in freq_dict.items()]
+
+    n = len(nodes)
+    sorted_nodes = counting_sort(nodes)
+    sum_nodes = [HuffmanNode(char=None, freq=float('inf'))] * (n - 1)
+
+    i = 0  # указатель на текущий узел в sorted_nodes
+    j = 0  # указатель на текущий узел в sum_nodes
+    k = 0  # указатель на место для нового суммированного узла
+
+    while i < n - 1 or j < k:
+        min1 = min2 = None
+
+        if i < n and (j >= k or sorted_nodes[i].freq <= sum_nodes[j].freq):
+            min1 = sorted_nodes[i]
+            i += 1
+        elif j < k:
+            min1 = sum_nodes[j]
+            j += 1
+        else:
+            break
+
+        if i < n and (j >= k or sorted_nodes[i].freq <= sum_nodes[j].freq):
+            min2 = sorted_nodes[i]
+            i += 1
+        elif j < k:
+            min2 = sum_nodes[j]
+            j += 1
+        else:
+            break
+
+        new_node = HuffmanNode(char=None, freq=min1.freq + min2.freq)
+        new_node.left = min1
+        new_node.right = min2
+
+        sum_nodes[k] = new_node
+        k += 1
+
+    return sum_nodes[k-1] if k > 0 else sorted_nodes[0]
+
+
+def huffman_code_lengths(root):
+    """
+    Возвращает длины кодов и частоты символов по дереву Хаффмана.
+
+    Returns:
+        tuple: ({символ: длина кода}, {символ: частота})
+    """
+    lengths = {}
+    freqs = {}
+    if root is None:
+        return lengths, freqs
+
+    stack = [(root, 0)]
+
+    while stack:
+        node, depth = stack.pop()
+
+        if node.char is not None:
+            # Единственному символу текста соответствует код длины 1
+            lengths[node.char] = max(depth, 1)
+            freqs[node.char] = node.freq
+            continue
+
+        if node.right:
+            stack.append((node.right, depth + 1))
+
+        if node.left:
+            stack.append((node.left, depth + 1))
+
+    return lengths, freqs
+
+
+def limit_code_lengths(lengths, freqs, max_length=MAX_CODE_LENGTH):
+    """
+    Ограничивает длины кодов значением max_length.
+
+    Количество кодов каждой длины корректируется так же, как при
+    построении таблиц Хаффмана в JPEG: пара самых длинных кодов
+    заменяется одним кодом на уровень короче, а ближайший более
+    короткий код - двумя кодами на уровень длиннее. Затем длины
+    назначаются символам в порядке убывания частоты.
+
+    Returns:
+        dict: {символ: длина кода}
+    """
+    longest = max(lengths.values(), default=0)
+    # Код длины max_length вмещает не более 2 ** max_length символов
+    max_length = max(max_length, (len(lengths) - 1).bit_length())
+    if longest <= max_length:
+        return lengths
+
+    count = [0] * (longest + 1)
+    for length in lengths.values():
+        count[length] += 1
+
+    for length in range(longest, max_length, -1):
+        while count[length]:
+            shorter = length - 2
+            while not count[shorter]:
+                shorter -= 1
+            count[length] -= 2
+            count[length - 1] += 1
+            count[shorter + 1] += 2
+            count[shorter] -= 1
+
+    symbols = iter(sorted(lengths, key=lambda char: (-freqs[char], char)))
+    limited = {}
+    for length in range(1, max_length + 1):
+        for _ in range(count[length]):
+            limited[next(symbols)] = length
+    return limited
+
+
+def canonical_codes(lengths):
+    """
+    Назначает канонические коды Хаффмана по длинам кодов.
+
+    Символы упорядочиваются по длине кода, затем по коду символа; каждый
+    следующий код на единицу больше предыдущего, дополненного нулями до
+    своей длины. Поэтому коды восстанавливаются по одним длинам.
+
+    Raises:
+        ValueError: если коды таких длин не могут быть префиксными
+
+    Returns:
+        dict: {символ: код Хаффмана}
+    """
+    codes = {}
+    code = 0
+    previous_length = 0
+    for char, length in sorted(
+        lengths.items(), key=lambda item: (item[1], item[0])
+    ):
+        if length < 1:
+            raise ValueError('Invalid Huffman code length')
+        code <<= length - previous_length
+        if code >> length:
+            raise ValueError('Huffman code lengths are not prefix-free')
+        codes[char] = format(code, f'0{length}b')
+        code += 1
+        previous_length = length
+    return codes
+
+
+def canonical_table(codes):
+    """
+    Возвращает компактное описание канонических кодов.
+
+    Returns:
+        dict: {длина кода: символы этой длины в каноническом порядке}
+    """
+    table = {}
+    for char, code in sorted(
+        codes.items(), key=lambda item: (len(item[1]), item[0])
+    ):
+        table[len(code)] = table.get(len(code), '') + char
+    return table
+
+
+def codes_from_canonical_table(table):
+    """
+    Восстанавливает словарь кодов по результату canonical_table.
+
+    Длины кодов проверяются до построения кодов: коды строятся сдвигом
+    числа на длину кода, поэтому большая длина заняла бы много памяти.
+
+    Raises:
+        ValueError: если длина кода вне диапазона 1..MAX_CODE_LENGTH,
+            символов больше MAX_CODES или символ повторяется
+    """
+    if sum(map(len, table.values())) > MAX_CODES:
+        raise ValueError('Too many symbols in Huffman code table')
+    lengths = {}
+    for length, chars in table.items():
+        length = int(length)
+        if not 1 <= length <= MAX_CODE_LENGTH:
+            raise ValueError('Invalid Huffman code length')
+        for char in chars:
+            if char in lengths:
+                raise ValueError('Duplicate symbol in Huffman code table')
+            lengths[char] = length
+    return canonical_codes(lengths)
+
+
+def build_huffman_codes(root, max_length=None):
+    """
+    Создает словарь с каноническими кодами Хаффмана для каждого символа.
+
+    Длины кодов определяются деревом Хаффмана (при заданном max_length
+    ограничиваются, см. limit_code_lengths), а сами коды назначаются
+    канонически (см. canonical_codes).
+    """
+    lengths, freqs = huffman_code_lengths(root)
+    if max_length is not None:
+        lengths = limit_code_lengths(lengths, freqs, max_length)
+    return canonical_codes(lengths)
+
+
+def huffman_encode(text, max_length=None):
+    """Кодирует текст с помощью алгоритма Хаффмана."""
+    if not text:
+        return "", {}
+
+    tree = build_huffman_tree(text)
+    codes = build_huffman_codes(tree, max_length)
+    encoded = "".join(map(codes.__getitem__, text))
+
+    return encoded, codes
+
+
+def pack_bits(text, codes, chunk_size=PACK_CHUNK_SIZE):
+    """
+    Кодирует текст в упакованную последовательность бит.
+
+    Текст обрабатывается частями: каждая часть переводится в строку бит
+    по таблице кодов, целые байты упаковываются преобразованием строки бит
+    в число, а оставшиеся биты переносятся в следующую часть. Последний
+    байт дополняется нулями.
+
+    Args:
+        text: исходный текст
+        codes: словарь {символ: код Хаффмана}
+        chunk_size: размер части текста в символах
+
+    Returns:
+        tuple: (байты, количество значащих бит)
+    """
+    lookup = codes.__getitem__
+    packed = bytearray()
+    bit_length = 0
+    carry = ''
+    for start in range(0, len(text), chunk_size):
+        bits = carry + "".join(map(lookup, text[start:start + chunk_size]))
+        bit_length += len(bits) - len(carry)
+        whole = len(bits) - len(bits) % 8
+        if whole:
+            packed += int(bits[:whole], 2).to_bytes(whole // 8, 'big')
+        carry = bits[whole:]
+    if carry:
+        packed.append(int(carry.ljust(8, '0'), 2))
+    return bytes(packed), bit_length
+
+
+class HuffmanDecoder:
+    """
+    Декодер кода Хаффмана по таблице переходов.
+
+    Состояние декодера - внутренний узел дерева кодов. Для пары
+    (состояние, очередной байт) таблица хранит символы, декодированные
+    из восьми бит этого байта, и новое состояние, поэтому декодирование
+    выполняется побайтно, а не обходом дерева по одному биту. Таблица
+    заполняется по мере появления пар во входных данных.
+
+    Принимаются только полные префиксные коды (коды дерева Хаффмана)
+    не более чем для MAX_CODES символов длиной не более
+    MAX_DECODE_CODE_LENGTH, поэтому размер дерева ограничен числом символов.
+    """
+
+    def __init__(self, codes):
+        self.symbols = []
+        # Дочерние узлы [по биту 0, по биту 1]: индекс внутреннего узла,
+        # ~индекс символа для листа или None
+        self.children = [[None, None]]
+        self.transitions = {}
+
+        if len(codes) > MAX_CODES:
+            raise ValueError('Too many symbols in Huffman code table')
+        for char, code in codes.items():
+            if not code or code.strip('01'):
+                raise ValueError('Invalid Huffman code')
+            if len(code) > MAX_DECODE_CODE_LENGTH:
+                raise ValueError('Huffman code is too long')
+            node = 0
+            for bit in code[:-1]:
+                child = self.children[node][bit == '1']
+                if child is None:
+                    child = len(self.children)
+                    # В дереве кода Хаффмана у каждого внутреннего узла два
+                    # потомка, поэтому внутренних узлов меньше, чем символов
+                    if child >= len(codes):
+                        raise ValueError('Huffman codes are not complete')
+                    self.children.append([None, None])
+                    self.children[node][bit == '1'] = child
+                elif child < 0:
+                    raise ValueError('Huffman codes are not prefix-free')
+                node = child
+            if self.children[node][code[-1] == '1'] is not None:
+                raise ValueError('Huffman codes are not prefix-free')
+            self.children[node][code[-1] == '1'] = ~len(self.symbols)
+            self.symbols.append(char)
+
+    def _step(self, state, byte, bits=8):
+        """Декодирует старшие bits бит байта, начиная с состояния state."""
+        decoded = []
+        for shift in range(7, 7 - bits, -1):
+            child = self.children[state][(byte >> shift) & 1]
+            if child is None:
+                raise ValueError('Invalid Huffman bitstream')
+            if child < 0:
+                decoded.append(self.symbols[~child])
+                state = 0
+            else:
+                state = child
+        return ''.join(decoded), state
+
+    def decode(self, data, bit_length):
+        """
+        Декодирует упакованную последовательность бит.
+
+        Args:
+            data: байты, полученные pack_bits
+            bit_length: количество значащих бит
+
+        Returns:
+            str: исходный текст
+        """
+        whole, rest = divmod(bit_length, 8)
+        if len(data) < whole + bool(rest):
+            raise ValueError('Bit length exceeds data size')
+
+        transitions = self.transitions
+        step = self._step
+        decoded = []
+        state = 0
+        for byte in data[:whole]:
+            key = state << 8 | byte
+            entry = transitions.get(key)
+            if entry is None:
+                entry = transitions[key] = step(state, byte)
+            chars, state = entry
+            decoded.append(chars)
+        if rest:
+            chars, state = step(state, data[whole], rest)
+            decoded.append(chars)
+        if state:
+            raise ValueError('Invalid Huffman bitstream')
+        return ''.join(decoded)
+
+
+def bits_to_bytes(bits):
+    """
+    Упаковывает строку из символов '0'/'1' в байты.
+
+    Returns:
+        tuple: (байты, количество значащих бит)
+
+    Raises:
+        ValueError: если строка содержит другие символы
+    """
+    if not bits:
+        return b'', 0
+    # int() допускает в числе пробелы по краям и символы '_'
+    if bits.strip('01'):
+        raise ValueError('Invalid bit string')
+    padded = bits.ljust(-(-len(bits) // 8) * 8, '0')
+    return int(padded, 2).to_bytes(len(padded) // 8, 'big'), len(bits)
+
+
+def huffman_encode_packed(text, max_length=None):
+    """
+    Кодирует текст алгоритмом Хаффмана в упакованные биты.
+
+    Returns:
+        tuple: (байты, количество значащих бит, словарь кодов)
+    """
+    if not text:
+        return b'', 0, {}
+
+    codes = build_huffman_codes(build_huffman_tree(text), max_length)
+    data, bit_length = pack_bits(text, codes)
+    return data, bit_length, codes
+
+
+def bytes_to_bits(data, bit_length):
+    """Возвращает строку из символов '0'/'1' для упакованных бит."""
+    if not bit_length:
+        return ''
+    bits = bin(int.from_bytes(data, 'big'))[2:].zfill(len(data) * 8)
+    return bits[:bit_length]
+
+
+def huffman_decode(data, bit_length, codes):
+    """
+    Декодирует упакованные биты кода Хаффмана (см. HuffmanDecoder).
+
+    Raises:
+        ValueError: если коды не префиксные или не полные, превышают
+            ограничения HuffmanDecoder или биты им не соответствуют
+    """
+    return HuffmanDecoder(codes).decode(data, bit_length)
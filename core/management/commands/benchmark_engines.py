@@ -0,0 +1,61 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import best_time, peak_memory, synthetic_vectors
+from core.engines import ENGINES
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время и пиковую память суммирования векторов документов '
+        'движками расчета python и numpy'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sizes',
+            nargs='*',
+            type=int,
+            default=[1000, 10000, 100000],
+            help='Количество документов (по умолчанию 1000 10000 100000)'
+        )
+        parser.add_argument(
+            '--length',
+            type=int,
+            default=100,
+            help='Количество слов в документе'
+        )
+        parser.add_argument(
+            '--vocabulary',
+            type=int,
+            default=50000,
+            help='Размер словаря синтетических документов'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            engines = {name: engine() for name, engine in ENGINES.items()}
+        except ImproperlyConfigured as error:
+            raise CommandError(error) from error
+
+        self.stdout.write(
+            f'{"документов":>12} {"движок":>8} {"время, с":>10} '
+            f'{"память, МБ":>12}'
+        )
+        for size in options['sizes']:
+            vectors = list(synthetic_vectors(
+                size, options['length'], options['vocabulary']
+            ))
+            results = {}
+            for name, engine in engines.items():
+                results[name] = engine.accumulate(vectors)
+                elapsed = best_time(lambda: engine.accumulate(vectors))
+                memory = peak_memory(lambda: engine.accumulate(iter(vectors)))
+                self.stdout.write(
+                    f'{size:>12} {name:>8} {elapsed:>10.3f} '
+                    f'{memory / 2 ** 20:>12.1f}'
+                )
+            expected, *others = results.values()
+            if any(result != expected for result in others):
+                raise CommandError(
+                    f'Результаты движков различаются для {size} документов'
+                )
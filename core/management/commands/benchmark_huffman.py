@@ -0,0 +1,112 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import best_time, synthetic_texts
+from core.huffman import (
+    bits_to_bytes,
+    build_huffman_codes,
+    build_huffman_tree,
+    bytes_to_bits,
+    huffman_decode,
+    huffman_encode_packed,
+    pack_bits,
+)
+
+
+def decode_by_bits(bits, codes):
+    """Декодирует строку бит посимвольно, накапливая текущий код."""
+    chars = {code: char for char, code in codes.items()}
+    decoded = []
+    code = ''
+    for bit in bits:
+        code += bit
+        if code in chars:
+            decoded.append(chars[code])
+            code = ''
+    return ''.join(decoded)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет пропускную способность кодирования Хаффмана в строку '
+        'из символов "0"/"1" и в упакованные биты и декодирования'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sizes',
+            nargs='*',
+            type=int,
+            default=[1, 4],
+            help='Объем документа в МБ (по умолчанию 1 4)'
+        )
+        parser.add_argument(
+            '--vocabulary',
+            type=int,
+            default=20000,
+            help='Размер словаря синтетического документа'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"МБ":>6} {"операция":<28} {"время, с":>10} {"МБ/с":>8} '
+            f'{"результат, МБ":>14}'
+        )
+        for size in options['sizes']:
+            # Синтетическое слово с пробелом занимает в UTF-8 около 13 байт
+            text, = synthetic_texts(
+                1, size * 2 ** 20 // 13, options['vocabulary']
+            )
+            text_size = len(text.encode())
+            megabytes = text_size / 2 ** 20
+
+            codes = build_huffman_codes(build_huffman_tree(text))
+            encoded = ''.join(map(codes.__getitem__, text))
+            data, bit_length, _ = huffman_encode_packed(text)
+            if bits_to_bytes(encoded) != (data, bit_length):
+                raise CommandError('Упакованные биты не совпадают со строкой бит')
+            if huffman_decode(data, bit_length, codes) != text:
+                raise CommandError('Декодированный текст не совпадает с исходным')
+
+            for name, func, result in (
+                (
+                    'построение кодов',
+                    lambda: build_huffman_codes(build_huffman_tree(text)),
+                    None
+                ),
+                (
+                    'строка бит',
+                    lambda: ''.join(map(codes.__getitem__, text)),
+                    len(encoded)
+                ),
+                ('упаковка бит', lambda: pack_bits(text, codes), len(data)),
+                (
+                    'кодирование в байты',
+                    lambda: huffman_encode_packed(text),
+                    len(data)
+                ),
+                (
+                    'декодирование по битам',
+                    lambda: decode_by_bits(encoded, codes),
+                    text_size
+                ),
+                (
+                    'декодирование байтов',
+                    lambda: huffman_decode(data, bit_length, codes),
+                    text_size
+                ),
+                (
+                    'декодирование строки бит',
+                    lambda: huffman_decode(*bits_to_bytes(encoded), codes),
+                    text_size
+                ),
+                (
+                    'байты в строку бит',
+                    lambda: bytes_to_bits(data, bit_length),
+                    len(encoded)
+                ),
+            ):
+                elapsed = best_time(func)
+                result = '' if result is None else f'{result / 2 ** 20:.2f}'
+                self.stdout.write(
+                    f'{megabytes:>6.1f} {name:<28} {elapsed:>10.3f} '
+                    f'{megabytes / elapsed:>8.1f} {result:>14}'
+                )
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.benchmarks import create_synthetic_collection, peak_memory
+from core.services import rebuild_collection_index
+from core.tokenizer import count_words
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пиковую память построения индекса коллекции потоковым '
+        'проходом по векторам документов и подсчетом по всем текстам сразу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sizes',
+            nargs='*',
+            type=int,
+            default=[1000, 10000],
+            help='Количество документов в коллекции (по умолчанию 1000 10000)'
+        )
+        parser.add_argument(
+            '--length',
+            type=int,
+            default=200,
+            help='Количество слов в документе'
+        )
+        parser.add_argument(
+            '--vocabulary',
+            type=int,
+            default=20000,
+            help='Размер словаря синтетических документов'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"документов":>12} {"потоковый, МБ":>15} {"все тексты, МБ":>15}'
+        )
+        for size in options['sizes']:
+            # Синтетические данные удаляются откатом транзакции
+            with transaction.atomic():
+                collection = create_synthetic_collection(
+                    size, options['length'], options['vocabulary']
+                )
+                streaming = peak_memory(
+                    lambda: rebuild_collection_index(collection)
+                )
+                materialized = peak_memory(lambda: count_words(' '.join(
+                    collection.documents.values_list('content', flat=True)
+                )))
+                transaction.set_rollback(True)
+            self.stdout.write(
+                f'{size:>12} {streaming / 2 ** 20:>15.1f} '
+                f'{materialized / 2 ** 20:>15.1f}'
+            )
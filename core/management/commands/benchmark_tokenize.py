@@ -0,0 +1,178 @@
+import os
+import re
+from collections import Counter
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.benchmarks import best_time, synthetic_texts
+from core.tokenizer import (
+    TokenPipeline,
+    count_words,
+    count_words_parallel,
+    iter_tokens,
+    tokenize,
+)
+
+
+def count_words_findall(text):
+    """Подсчет частот слов до 0.21.0: регулярное выражение без компиляции."""
+    return Counter(re.findall(r'\b\w+\b', text.lower()))
+
+
+def pipeline_counter(**options):
+    """Возвращает подсчет частот слов через конвейер с настройками options."""
+    def count(text):
+        # Конвейер создается для каждой коллекции заново, поэтому кеш
+        # обработанных слов в замер входит
+        return Counter(TokenPipeline(**options).process(iter_tokens(text)))
+    return count
+
+
+# Способы токенизации, сравниваемые в режиме --methods
+METHODS = (
+    ('re.findall (до 0.21.0)', count_words_findall),
+    ('count_words', count_words),
+    ('tokenize', tokenize),
+    ('Counter(iter_tokens)', lambda text: Counter(iter_tokens(text))),
+    ('конвейер: стоп-слова', pipeline_counter(stop_words=True)),
+    ('конвейер: все этапы', pipeline_counter(
+        stop_words=True, stemming=True, min_length=3
+    )),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет ускорение параллельного подсчета частот слов в зависимости '
+        'от числа процессов, с --methods - скорость токенизации (токенов '
+        'в секунду) прежним и текущим токенизатором и конвейером обработки слов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sizes',
+            nargs='*',
+            type=int,
+            default=[4, 16],
+            help='Объем коллекции текстов в МБ (по умолчанию 4 16)'
+        )
+        parser.add_argument(
+            '--documents',
+            type=int,
+            default=4,
+            help='Количество текстов в коллекции'
+        )
+        parser.add_argument(
+            '--vocabulary',
+            type=int,
+            default=20000,
+            help='Размер словаря синтетических текстов'
+        )
+        parser.add_argument(
+            '--workers',
+            nargs='+',
+            type=int,
+            help='Числа процессов (по умолчанию 1, 2, 4, ... до числа ядер)'
+        )
+        parser.add_argument(
+            '--methods',
+            action='store_true',
+            help=(
+                'Сравнить способы токенизации в одном процессе вместо '
+                'замера параллельного подсчета'
+            )
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=1000000,
+            help='Количество слов синтетического текста для --methods'
+        )
+        parser.add_argument(
+            '--files',
+            nargs='+',
+            default=[],
+            help=(
+                'Текстовые файлы в UTF-8 для --methods '
+                '(по умолчанию синтетический текст)'
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options['methods']:
+            self.compare_methods(options)
+        else:
+            self.compare_workers(options)
+
+    def compare_workers(self, options):
+        workers = options['workers']
+        if not workers:
+            cpu_count = os.cpu_count() or 1
+            workers = [1]
+            while workers[-1] * 2 < cpu_count:
+                workers.append(workers[-1] * 2)
+            if cpu_count > 1:
+                workers.append(cpu_count)
+
+        self.stdout.write(
+            f'{"МБ":>6} {"процессов":>10} {"время, с":>10} {"МБ/с":>8} '
+            f'{"ускорение":>10}'
+        )
+        for size in options['sizes']:
+            # Синтетическое слово с пробелом занимает в UTF-8 около 13 байт
+            length = size * 2 ** 20 // 13 // options['documents']
+            texts = list(synthetic_texts(
+                options['documents'], length, options['vocabulary']
+            ))
+            megabytes = sum(len(text.encode()) for text in texts) / 2 ** 20
+            expected = None
+            baseline = None
+            for count in workers:
+                def run():
+                    return count_words_parallel(
+                        texts, count, 0, settings.TOKENIZE_CHUNK_SIZE
+                    )
+
+                # Первый запуск создает пул процессов и не учитывается
+                result = run()
+                if expected is None:
+                    expected = result
+                elif result != expected:
+                    raise CommandError(
+                        f'Частоты слов для {count} процессов отличаются'
+                    )
+                elapsed = best_time(run)
+                baseline = baseline or elapsed
+                self.stdout.write(
+                    f'{megabytes:>6.1f} {count:>10} {elapsed:>10.3f} '
+                    f'{megabytes / elapsed:>8.1f} {baseline / elapsed:>10.2f}'
+                )
+
+    def compare_methods(self, options):
+        if options['files']:
+            texts = {}
+            for path in options['files']:
+                try:
+                    with open(path, encoding='utf-8') as file:
+                        texts[path] = file.read()
+                except (OSError, UnicodeDecodeError) as error:
+                    raise CommandError(f'{path}: {error}') from error
+        else:
+            text, = synthetic_texts(1, options['words'], options['vocabulary'])
+            texts = {'синтетический': text}
+
+        self.stdout.write(
+            f'{"текст":<16} {"способ":<24} {"время, с":>10} '
+            f'{"млн токенов/с":>14}'
+        )
+        for name, text in texts.items():
+            tokens = len(tokenize(text))
+            if count_words_findall(text) != count_words(text):
+                raise CommandError(
+                    f'{name}: частоты слов отличаются от прежнего токенизатора'
+                )
+            for method, func in METHODS:
+                elapsed = best_time(lambda: func(text))
+                self.stdout.write(
+                    f'{name[-16:]:<16} {method:<24} {elapsed:>10.3f} '
+                    f'{tokens / elapsed / 1e6:>14.2f}'
+                )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from core.models import Collections
+from core.services import rebuild_collection_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает инвертированные индексы коллекций'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'collection_ids',
+            nargs='*',
+            type=int,
+            help='id коллекций (по умолчанию все коллекции)'
+        )
+
+    def handle(self, *args, **options):
+        collections = Collections.objects.all()
+        if options['collection_ids']:
+            collections = collections.filter(pk__in=options['collection_ids'])
+
+        for collection in collections.iterator():
+            rebuild_collection_index(collection)
+            self.stdout.write(f'Индекс коллекции {collection.id} перестроен')
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from core.services import claim_statistics_job, run_statistics_job
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь заданий на расчет статистики по коллекциям'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между проверками пустой очереди, секунды'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать задания из очереди и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_statistics_job()
+            if job is None:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+                continue
+
+            run_statistics_job(job)
+            self.stdout.write(f'Задание {job.id}: {job.status}')
@@ -0,0 +1,492 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import BigIntegerField, Case, F, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+from .constants import (
+    COLLECTION_SIZE_BUCKETS,
+    LATENCY_BUCKETS,
+    RESPONSE_SIZE_BUCKETS
+)
+from .models import (
+    Collections,
+    CollectionMetrics,
+    Document,
+    DocumentMetrics,
+    MetricsHistogram,
+    MetricsHistogramBucket
+)
+
+logger = logging.getLogger(__name__)
+
+HISTOGRAM_BOUNDS = {
+    'latency': LATENCY_BUCKETS,
+    'stage_duration': LATENCY_BUCKETS,
+    'response_bytes': RESPONSE_SIZE_BUCKETS,
+}
+
+# Имя, метка и описание гистограмм в формате Prometheus
+PROMETHEUS_HISTOGRAMS = {
+    'latency': (
+        'tfidf_request_duration_seconds',
+        'collection_size',
+        'Время обработки запросов статистики',
+    ),
+    'stage_duration': (
+        'tfidf_stage_duration_seconds',
+        'stage',
+        'Время выполнения этапов обработки запросов',
+    ),
+    'response_bytes': (
+        'tfidf_response_bytes',
+        None,
+        'Размер тела ответа',
+    ),
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+def collection_size_bucket(size):
+    """Возвращает метку корзины размера коллекции."""
+    if size is None:
+        return ''
+    for bound in COLLECTION_SIZE_BUCKETS:
+        if size <= bound:
+            return f'<={bound}'
+    return f'>{COLLECTION_SIZE_BUCKETS[-1]}'
+
+
+def histogram_percentile(buckets, bounds, percentile):
+    """
+    Оценивает перцентиль по гистограмме.
+
+    Внутри корзины значения считаются распределенными равномерно, для
+    последней (неограниченной) корзины возвращается ее нижняя граница.
+    """
+    count = sum(buckets)
+    if not count:
+        return None
+
+    rank = count * percentile / 100
+    cumulative = 0
+    for index, bucket_count in enumerate(buckets):
+        if bucket_count and cumulative + bucket_count >= rank:
+            if index == len(bounds):
+                return bounds[-1]
+            lower = bounds[index - 1] if index else 0.0
+            return lower + (
+                (bounds[index] - lower) * (rank - cumulative) / bucket_count
+            )
+        cumulative += bucket_count
+    return bounds[-1]
+
+
+def histogram_summary(buckets, bounds):
+    """Возвращает количество значений и перцентили гистограммы."""
+    summary = {'count': sum(buckets)}
+    for percentile in PERCENTILES:
+        value = histogram_percentile(buckets, bounds, percentile)
+        summary[f'p{percentile}'] = (
+            round(value, 3) if value is not None else None
+        )
+    return summary
+
+
+def latency_summary(endpoint):
+    """
+    Возвращает гистограмму и перцентили времени обработки эндпоинта,
+    в том числе в разбивке по размеру коллекции.
+    """
+    bounds = HISTOGRAM_BOUNDS['latency']
+    total = [0] * (len(bounds) + 1)
+    by_collection_size = {}
+    histograms = MetricsHistogram.objects.filter(
+        metric='latency',
+        endpoint=endpoint
+    ).order_by('label').prefetch_related('bucket_counts')
+    for histogram in histograms:
+        total = [a + b for a, b in zip(total, histogram.buckets)]
+        if histogram.label:
+            by_collection_size[histogram.label] = histogram_summary(
+                histogram.buckets, bounds
+            )
+
+    labels = [str(bound) for bound in bounds] + ['+Inf']
+    return {
+        **histogram_summary(total, bounds),
+        'buckets': dict(zip(labels, total)),
+        'by_collection_size': by_collection_size,
+    }
+
+
+def cached_row_counts():
+    """Возвращает количество документов и коллекций, кешируемое на время."""
+    return cache.get_or_set(
+        'metrics:row_counts',
+        lambda: {
+            'documents': Document.objects.count(),
+            'collections': Collections.objects.count(),
+        },
+        settings.METRICS_ROW_COUNTS_TIMEOUT
+    )
+
+
+def _prometheus_labels(**labels):
+    """Форматирует метки Prometheus."""
+    formatted = []
+    for name, value in labels.items():
+        value = (
+            str(value).replace('\\', '\\\\')
+            .replace('"', '\\"').replace('\n', '\\n')
+        )
+        formatted.append(f'{name}="{value}"')
+    return '{' + ','.join(formatted) + '}'
+
+
+def render_prometheus():
+    """Возвращает метрики в текстовом формате Prometheus."""
+    lines = []
+
+    counters = (
+        ('tfidf_statistics_requests_total', 'statistics_requests',
+         'Количество запросов статистики'),
+        ('tfidf_cache_hits_total', 'cache_hits',
+         'Количество попаданий в кеш статистики'),
+        ('tfidf_cache_misses_total', 'cache_misses',
+         'Количество промахов кеша статистики'),
+    )
+    metrics_rows = [
+        metrics_model.objects.get_or_create(pk=1)[0]
+        for metrics_model in (DocumentMetrics, CollectionMetrics)
+    ]
+    for name, field, description in counters:
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for row in metrics_rows:
+            labels = _prometheus_labels(endpoint=row.endpoint)
+            lines.append(f'{name}{labels} {getattr(row, field)}')
+
+    row_counts = cached_row_counts()
+    for name, key, description in (
+        ('tfidf_documents', 'documents', 'Количество документов'),
+        ('tfidf_collections', 'collections', 'Количество коллекций'),
+    ):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.append(f'{name} {row_counts[key]}')
+
+    histograms = MetricsHistogram.objects.order_by(
+        'metric', 'endpoint', 'label'
+    ).prefetch_related('bucket_counts')
+    by_metric = {}
+    for histogram in histograms:
+        by_metric.setdefault(histogram.metric, []).append(histogram)
+
+    for metric, (name, label_name, description) in PROMETHEUS_HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        bounds = HISTOGRAM_BOUNDS[metric]
+        for histogram in by_metric.get(metric, ()):
+            labels = {'endpoint': histogram.endpoint}
+            if label_name and histogram.label:
+                labels[label_name] = histogram.label
+            cumulative = 0
+            for bound, count in zip(
+                [*bounds, '+Inf'], histogram.buckets
+            ):
+                cumulative += count
+                bucket_labels = _prometheus_labels(**labels, le=bound)
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            series_labels = _prometheus_labels(**labels)
+            lines.append(f'{name}_sum{series_labels} {histogram.total}')
+            lines.append(f'{name}_count{series_labels} {histogram.count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsAggregator:
+    """
+    Накапливает метрики в памяти процесса и периодически сбрасывает их в БД.
+
+    Сброс выполняется фоновым потоком раз в METRICS_FLUSH_INTERVAL секунд,
+    поэтому запросы статистики не обращаются к БД ради метрик. Счетчики и
+    корзины гистограмм увеличиваются UPDATE с F()-выражениями, поэтому
+    одновременные сбросы из разных процессов не теряют обновлений и не
+    блокируют строки дольше одного запроса.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.histograms = {}
+        self.created_models = set()
+        self.histogram_ids = {}
+        self.flusher_pid = None
+
+    def _get_pending(self, metrics_model):
+        return self.pending.setdefault(metrics_model, {
+            'requests': 0,
+            'total_time': 0.0,
+            'min_time': None,
+            'max_time': 0.0,
+            'latest_timestamp': None,
+            'cache_hits': 0,
+            'cache_misses': 0,
+        })
+
+    def _get_histogram(self, key, size):
+        return self.histograms.setdefault(key, {
+            'count': 0,
+            'total': 0.0,
+            'buckets': [0] * size,
+        })
+
+    def _observe(self, metric, endpoint, value, label=''):
+        bounds = HISTOGRAM_BOUNDS[metric]
+        histogram = self._get_histogram(
+            (metric, endpoint, label), len(bounds) + 1
+        )
+        histogram['count'] += 1
+        histogram['total'] += value
+        histogram['buckets'][bisect_left(bounds, value)] += 1
+
+    def observe(self, metric, endpoint, value, label=''):
+        """Добавляет значение в гистограмму метрики."""
+        with self.lock:
+            self._observe(metric, endpoint, value, label)
+        self.start()
+
+    @contextmanager
+    def stage(self, endpoint, stage):
+        """Измеряет время выполнения этапа обработки запроса."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(
+                'stage_duration',
+                endpoint,
+                time.perf_counter() - start_time,
+                stage
+            )
+
+    def record(self, metrics_model, execution_time, collection_size=None):
+        """Учитывает время обработки одного запроса статистики."""
+        with self.lock:
+            self._observe(
+                'latency',
+                metrics_model.endpoint,
+                execution_time,
+                collection_size_bucket(collection_size)
+            )
+            pending = self._get_pending(metrics_model)
+            pending['requests'] += 1
+            pending['total_time'] += execution_time
+            if pending['min_time'] is None or execution_time < pending['min_time']:
+                pending['min_time'] = execution_time
+            pending['max_time'] = max(pending['max_time'], execution_time)
+            pending['latest_timestamp'] = timezone.now()
+        self.start()
+
+    def record_cache_access(self, metrics_model, hits=0, misses=0):
+        """Учитывает попадания и промахи кеша статистики."""
+        with self.lock:
+            pending = self._get_pending(metrics_model)
+            pending['cache_hits'] += hits
+            pending['cache_misses'] += misses
+        self.start()
+
+    def start(self):
+        """
+        Запускает поток фонового сброса метрик, если он еще не запущен
+        в текущем процессе (после fork поток запускается заново).
+        """
+        pid = os.getpid()
+        if self.flusher_pid == pid:
+            return
+        with self.lock:
+            if self.flusher_pid == pid:
+                return
+            self.flusher_pid = pid
+        threading.Thread(
+            target=self._run_flusher,
+            name='metrics-flusher',
+            daemon=True
+        ).start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            finally:
+                # Соединения с БД принадлежат потоку, между сбросами
+                # они не нужны
+                connections.close_all()
+
+    def flush(self):
+        """
+        Сбрасывает накопленные метрики в БД.
+
+        Сброс выполняется в одной транзакции. Если запись не удалась,
+        ошибка записывается в лог, а накопленные значения возвращаются
+        в память и попадают в следующий сброс.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            histograms, self.histograms = self.histograms, {}
+        if not pending and not histograms:
+            return
+
+        try:
+            with transaction.atomic():
+                self._flush_histograms(histograms)
+                self._flush_counters(pending)
+        except Exception:
+            # Метрики не должны влиять на обработку запросов: любая ошибка
+            # сброса только откладывает запись до следующего сброса
+            logger.exception('Не удалось сбросить метрики в БД')
+            self.created_models.clear()
+            self.histogram_ids.clear()
+            self._restore(pending, histograms)
+
+    def _restore(self, pending, histograms):
+        """Возвращает несброшенные значения к накопленным с тех пор."""
+        with self.lock:
+            for key, values in histograms.items():
+                histogram = self._get_histogram(key, len(values['buckets']))
+                histogram['count'] += values['count']
+                histogram['total'] += values['total']
+                histogram['buckets'] = [
+                    a + b
+                    for a, b in zip(histogram['buckets'], values['buckets'])
+                ]
+
+            for metrics_model, values in pending.items():
+                current = self._get_pending(metrics_model)
+                for field in (
+                    'requests', 'total_time', 'cache_hits', 'cache_misses'
+                ):
+                    current[field] += values[field]
+                current['max_time'] = max(
+                    current['max_time'], values['max_time']
+                )
+                for field, choose in (
+                    ('min_time', min),
+                    ('latest_timestamp', max),
+                ):
+                    known = [
+                        value
+                        for value in (current[field], values[field])
+                        if value is not None
+                    ]
+                    current[field] = choose(known) if known else None
+
+    def _flush_counters(self, pending):
+        """Прибавляет накопленные счетчики к моделям метрик."""
+        for metrics_model, values in pending.items():
+            if metrics_model not in self.created_models:
+                metrics_model.objects.get_or_create(pk=1)
+                self.created_models.add(metrics_model)
+
+            update = {
+                'cache_hits': F('cache_hits') + values['cache_hits'],
+                'cache_misses': F('cache_misses') + values['cache_misses'],
+            }
+            if values['requests']:
+                requests = values['requests']
+                total_time = values['total_time']
+                min_time = Value(values['min_time'])
+                latest_timestamp = Value(values['latest_timestamp'])
+                update.update({
+                    'statistics_requests': F('statistics_requests') + requests,
+                    'total_time_processed': F('total_time_processed') + total_time,
+                    'avg_time_processed': (
+                        (F('total_time_processed') + total_time)
+                        / (F('statistics_requests') + requests)
+                    ),
+                    'min_time_processed': Case(
+                        When(min_time_processed=0, then=min_time),
+                        default=Least(F('min_time_processed'), min_time)
+                    ),
+                    'max_time_processed': Greatest(
+                        F('max_time_processed'),
+                        Value(values['max_time'])
+                    ),
+                    'latest_statistics_processed_timestamp': Greatest(
+                        Coalesce(
+                            F('latest_statistics_processed_timestamp'),
+                            latest_timestamp
+                        ),
+                        latest_timestamp
+                    ),
+                })
+            metrics_model.objects.filter(pk=1).update(**update)
+
+    def _histogram_id(self, key, size):
+        """
+        Возвращает id гистограммы, создавая ее с нулевыми корзинами.
+
+        id запоминаются, поэтому гистограмма ищется в БД один раз
+        на процесс.
+        """
+        histogram_id = self.histogram_ids.get(key)
+        if histogram_id is None:
+            metric, endpoint, label = key
+            histogram, _ = MetricsHistogram.objects.get_or_create(
+                metric=metric,
+                endpoint=endpoint,
+                label=label
+            )
+            MetricsHistogramBucket.objects.bulk_create(
+                (
+                    MetricsHistogramBucket(histogram=histogram, index=index)
+                    for index in range(size)
+                ),
+                ignore_conflicts=True
+            )
+            histogram_id = self.histogram_ids[key] = histogram.pk
+        return histogram_id
+
+    def _flush_histograms(self, histograms):
+        """
+        Прибавляет накопленные корзины к гистограммам в БД.
+
+        На гистограмму выполняются два UPDATE: количества и суммы значений
+        и всех непустых корзин.
+        """
+        for key, values in sorted(histograms.items()):
+            histogram_id = self._histogram_id(key, len(values['buckets']))
+            MetricsHistogram.objects.filter(pk=histogram_id).update(
+                count=F('count') + values['count'],
+                total=F('total') + values['total']
+            )
+            counts = {
+                index: count
+                for index, count in enumerate(values['buckets'])
+                if count
+            }
+            MetricsHistogramBucket.objects.filter(
+                histogram_id=histogram_id,
+                index__in=list(counts)
+            ).update(count=F('count') + Case(
+                *(
+                    When(index=index, then=Value(count))
+                    for index, count in counts.items()
+                ),
+                default=Value(0),
+                output_field=BigIntegerField()
+            ))
+
+
+aggregator = MetricsAggregator()
+atexit.register(aggregator.flush)
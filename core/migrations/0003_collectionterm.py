@@ -0,0 +1,75 @@
+# Generated by Django 5.2 on 2026-10-18 06:48
+
+import re
+from collections import Counter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_indexes(apps, schema_editor):
+    """Строит индексы для коллекций, созданных до появления индекса."""
+    Collections = apps.get_model('core', 'Collections')
+    CollectionTerm = apps.get_model('core', 'CollectionTerm')
+    Document = apps.get_model('core', 'Document')
+
+    for collection in Collections.objects.all():
+        word_count = Counter()
+        doc_freq = Counter()
+        total_docs = 0
+        documents = Document.objects.filter(collections=collection)
+        for content in documents.values_list('content', flat=True):
+            words = re.findall(r'\b\w+\b', content.lower())
+            word_count.update(words)
+            doc_freq.update(set(words))
+            total_docs += 1
+
+        CollectionTerm.objects.bulk_create(
+            (
+                CollectionTerm(
+                    collection=collection,
+                    word=word,
+                    doc_freq=doc_freq[word],
+                    term_freq=count
+                )
+                for word, count in word_count.items()
+            ),
+            batch_size=1000
+        )
+        collection.documents_count = total_docs
+        collection.total_words = sum(word_count.values())
+        collection.save(update_fields=('documents_count', 'total_words'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collections',
+            name='documents_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='collections',
+            name='total_words',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='CollectionTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.TextField()),
+                ('doc_freq', models.PositiveIntegerField(default=0)),
+                ('term_freq', models.PositiveBigIntegerField(default=0)),
+                ('collection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='core.collections')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('collection', 'word'), name='unique_collection_term')],
+            },
+        ),
+        migrations.RunPython(build_indexes, migrations.RunPython.noop),
+    ]
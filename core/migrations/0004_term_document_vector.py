@@ -0,0 +1,66 @@
+# Generated by Django 5.2 on 2026-10-18 06:50
+
+import re
+from array import array
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def build_vectors(apps, schema_editor):
+    """Рассчитывает векторы частот слов для существующих документов."""
+    Document = apps.get_model('core', 'Document')
+    Term = apps.get_model('core', 'Term')
+
+    for document in Document.objects.all().iterator():
+        word_count = Counter(re.findall(r'\b\w+\b', document.content.lower()))
+        Term.objects.bulk_create(
+            (Term(word=word) for word in word_count),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        ids = {}
+        words = list(word_count)
+        for start in range(0, len(words), 1000):
+            ids.update(
+                Term.objects.filter(word__in=words[start:start + 1000])
+                .values_list('word', 'pk')
+            )
+        pairs = sorted((ids[word], count) for word, count in word_count.items())
+        document.term_ids = array('I', [pk for pk, _ in pairs]).tobytes()
+        document.term_counts = array('I', [count for _, count in pairs]).tobytes()
+        document.words_count = sum(word_count.values())
+        document.save(update_fields=('term_ids', 'term_counts', 'words_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_collectionterm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('word', models.TextField(unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='term_counts',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='term_ids',
+            field=models.BinaryField(default=bytes),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='words_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(build_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_term_document_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectionmetrics',
+            name='cache_hits',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='collectionmetrics',
+            name='cache_misses',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='collections',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='documentmetrics',
+            name='cache_hits',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='documentmetrics',
+            name='cache_misses',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_statistics_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricsHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=64)),
+                ('endpoint', models.CharField(max_length=64)),
+                ('size_bucket', models.CharField(blank=True, max_length=16)),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('total', models.FloatField(default=0.0)),
+                ('buckets', models.JSONField(default=list)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('metric', 'endpoint', 'size_bucket'), name='unique_metrics_histogram')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_metricshistogram'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='metricshistogram',
+            name='unique_metrics_histogram',
+        ),
+        migrations.RenameField(
+            model_name='metricshistogram',
+            old_name='size_bucket',
+            new_name='label',
+        ),
+        migrations.AlterField(
+            model_name='metricshistogram',
+            name='label',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddConstraint(
+            model_name='metricshistogram',
+            constraint=models.UniqueConstraint(fields=('metric', 'endpoint', 'label'), name='unique_metrics_histogram'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 06:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_metricshistogram_label'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticsJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('collection_version', models.PositiveIntegerField()),
+                ('words_limit', models.PositiveIntegerField()),
+                ('order_key', models.CharField(max_length=16)),
+                ('reverse', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=16)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('collection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='statistics_jobs', to='core.collections')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='core_statis_status_b51c98_idx'), models.Index(fields=['collection', 'collection_version'], name='core_statis_collect_4b6897_idx')],
+            },
+        ),
+    ]
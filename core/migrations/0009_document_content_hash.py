@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-18 07:10
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    """Рассчитывает хеш содержимого существующих документов."""
+    Document = apps.get_model('core', 'Document')
+
+    batch = []
+    for document in Document.objects.only('id', 'content').iterator():
+        document.content_hash = hashlib.sha256(
+            document.content.encode('utf-8')
+        ).hexdigest()
+        batch.append(document)
+        if len(batch) >= 1000:
+            Document.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+    if batch:
+        Document.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_statisticsjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 07:11
+
+from array import array
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_postings(apps, schema_editor):
+    """Строит индекс вхождений слов по векторам существующих документов."""
+    Document = apps.get_model('core', 'Document')
+    Posting = apps.get_model('core', 'Posting')
+
+    documents = Document.objects.values_list('pk', 'term_ids', 'term_counts')
+    for document_id, term_ids, term_counts in documents.iterator():
+        ids = array('I')
+        ids.frombytes(term_ids)
+        counts = array('I')
+        counts.frombytes(term_counts)
+        Posting.objects.bulk_create(
+            (
+                Posting(term_id=term_id, document_id=document_id, count=count)
+                for term_id, count in zip(ids, counts)
+            ),
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='core.document')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='core.term')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'document'), name='unique_posting')],
+            },
+        ),
+        migrations.RunPython(build_postings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-18 07:16
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_posting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collections',
+            name='min_word_length',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AddField(
+            model_name='collections',
+            name='stemming',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='collections',
+            name='stop_words',
+            field=models.BooleanField(default=False),
+        ),
+    ]
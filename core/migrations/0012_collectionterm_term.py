@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_terms(apps, schema_editor):
+    """Заменяет слова индексов коллекций ссылками на словарь."""
+    CollectionTerm = apps.get_model('core', 'CollectionTerm')
+    Term = apps.get_model('core', 'Term')
+
+    words = list(CollectionTerm.objects.values_list('word', flat=True).distinct())
+    Term.objects.bulk_create(
+        (Term(word=word) for word in words),
+        batch_size=1000,
+        ignore_conflicts=True
+    )
+    CollectionTerm.objects.update(
+        term_id=Subquery(
+            Term.objects.filter(word=OuterRef('word')).values('pk')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_collections_pipeline'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collectionterm',
+            name='term',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='collection_terms', to='core.term'),
+        ),
+        migrations.RunPython(fill_terms, migrations.RunPython.noop),
+    ]
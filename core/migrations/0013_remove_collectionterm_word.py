@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-18 07:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_collectionterm_term'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='collectionterm',
+            name='unique_collection_term',
+        ),
+        migrations.RemoveField(
+            model_name='collectionterm',
+            name='word',
+        ),
+        migrations.AlterField(
+            model_name='collectionterm',
+            name='term',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='collection_terms', to='core.term'),
+        ),
+        migrations.AddConstraint(
+            model_name='collectionterm',
+            constraint=models.UniqueConstraint(fields=('collection', 'term'), name='unique_collection_term'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_buckets(apps, schema_editor):
+    """Переносит корзины гистограмм из JSON в строки корзин."""
+    MetricsHistogram = apps.get_model('core', 'MetricsHistogram')
+    MetricsHistogramBucket = apps.get_model('core', 'MetricsHistogramBucket')
+
+    MetricsHistogramBucket.objects.bulk_create(
+        (
+            MetricsHistogramBucket(
+                histogram_id=histogram_id,
+                index=index,
+                count=count
+            )
+            for histogram_id, buckets in MetricsHistogram.objects.values_list(
+                'pk', 'buckets'
+            )
+            for index, count in enumerate(buckets)
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_remove_collectionterm_word'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricsHistogramBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('count', models.PositiveBigIntegerField(default=0)),
+                ('histogram', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bucket_counts', to='core.metricshistogram')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('histogram', 'index'), name='unique_metrics_histogram_bucket')],
+            },
+        ),
+        migrations.RunPython(fill_buckets, migrations.RunPython.noop),
+    ]
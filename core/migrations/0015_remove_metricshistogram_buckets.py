@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 12:11
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_metricshistogrambucket'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='metricshistogram',
+            name='buckets',
+        ),
+    ]
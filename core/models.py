@@ -1,3 +1,4 @@
+from django.core.validators import MinValueValidator
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -12,6 +13,8 @@ class MetricsBase(models.Model):
     total_time_processed = models.FloatField(default=0.0)
     avg_time_processed = models.FloatField(default=0.0)
     max_time_processed = models.FloatField(default=0.0)
+    cache_hits = models.PositiveBigIntegerField(default=0)
+    cache_misses = models.PositiveBigIntegerField(default=0)
 
     class Meta:
         abstract = True
@@ -28,17 +31,76 @@ class MetricsBase(models.Model):
             'min_time_processed': round(self.min_time_processed, 3),
             'avg_time_processed': round(self.avg_time_processed, 3),
             'max_time_processed': round(self.max_time_processed, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
         }
 
 
 class DocumentMetrics(MetricsBase):
     """Метрики для документов."""
-    pass
+    endpoint = 'document_statistics'
 
 
 class CollectionMetrics(MetricsBase):
     """Метрики для коллекций."""
-    pass
+    endpoint = 'collection_statistics'
+
+
+class MetricsHistogram(models.Model):
+    """Гистограмма значений метрики с фиксированными границами корзин."""
+    metric = models.CharField(max_length=64)
+    endpoint = models.CharField(max_length=64)
+    label = models.CharField(max_length=32, blank=True)
+    count = models.PositiveBigIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('metric', 'endpoint', 'label'),
+                name='unique_metrics_histogram'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.endpoint} {self.label}".strip()
+
+    @property
+    def buckets(self):
+        """Количества значений в корзинах в порядке границ корзин."""
+        return [
+            bucket.count
+            for bucket in sorted(
+                self.bucket_counts.all(), key=lambda bucket: bucket.index
+            )
+        ]
+
+
+class MetricsHistogramBucket(models.Model):
+    """
+    Корзина гистограммы.
+
+    Корзины хранятся отдельными строками, чтобы сброс метрик прибавлял
+    к ним значения F()-выражениями без блокировки гистограммы.
+    """
+    histogram = models.ForeignKey(
+        MetricsHistogram,
+        on_delete=models.CASCADE,
+        related_name='bucket_counts'
+    )
+    index = models.PositiveSmallIntegerField()
+    count = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('histogram', 'index'),
+                name='unique_metrics_histogram_bucket'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.histogram} [{self.index}]"
 
 
 class Collections(models.Model):
@@ -50,6 +112,16 @@ class Collections(models.Model):
         on_delete=models.CASCADE,
         related_name='collections'
     )
+    documents_count = models.PositiveIntegerField(default=0)
+    total_words = models.PositiveBigIntegerField(default=0)
+    version = models.PositiveIntegerField(default=0)
+    # Этапы обработки слов документов перед добавлением в индекс коллекции
+    stop_words = models.BooleanField(default=False)
+    stemming = models.BooleanField(default=False)
+    min_word_length = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)]
+    )
 
     def __str__(self):
         return self.name or f"Collection {self.id}"
@@ -59,6 +131,10 @@ class Document(models.Model):
     """Документы."""
     title = models.CharField(max_length=255)
     content = models.TextField()
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    term_ids = models.BinaryField(default=bytes)
+    term_counts = models.BinaryField(default=bytes)
+    words_count = models.PositiveIntegerField(default=0)
     collections = models.ManyToManyField(Collections, related_name='documents')
     owner = models.ForeignKey(
         User,
@@ -68,3 +144,103 @@ class Document(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class Term(models.Model):
+    """Словарь слов, общий для всех документов."""
+    word = models.TextField(unique=True)
+
+    def __str__(self):
+        return self.word
+
+
+class Posting(models.Model):
+    """Индекс вхождений слов для поиска: частота слова в документе."""
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        related_name='postings'
+    )
+    document = models.ForeignKey(
+        Document,
+        on_delete=models.CASCADE,
+        related_name='postings'
+    )
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('term', 'document'),
+                name='unique_posting'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.term_id} ({self.document_id})"
+
+
+class CollectionTerm(models.Model):
+    """Инвертированный индекс коллекции: частоты слов."""
+    collection = models.ForeignKey(
+        Collections,
+        on_delete=models.CASCADE,
+        related_name='terms'
+    )
+    term = models.ForeignKey(
+        Term,
+        on_delete=models.CASCADE,
+        related_name='collection_terms'
+    )
+    doc_freq = models.PositiveIntegerField(default=0)
+    term_freq = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('collection', 'term'),
+                name='unique_collection_term'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.collection_id})"
+
+
+class StatisticsJob(models.Model):
+    """Задание на фоновый расчет статистики по коллекции."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    collection = models.ForeignKey(
+        Collections,
+        on_delete=models.CASCADE,
+        related_name='statistics_jobs'
+    )
+    collection_version = models.PositiveIntegerField()
+    words_limit = models.PositiveIntegerField()
+    order_key = models.CharField(max_length=16)
+    reverse = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=('status', 'created_at')),
+            models.Index(fields=('collection', 'collection_version')),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} ({self.status})"
@@ -0,0 +1,52 @@
+from array import array
+from json.encoder import encode_basestring
+
+
+class WordStatistics:
+    """
+    Статистика по словам в столбцовом виде: параллельные массивы слов,
+    TF и IDF.
+
+    Кешируется без словаря на каждое слово и записывается в JSON
+    напрямую из столбцов (см. to_json).
+    """
+    __slots__ = ('words', 'tf', 'idf')
+
+    def __init__(self, words=(), tf=(), idf=()):
+        self.words = list(words)
+        self.tf = array('d', tf)
+        self.idf = array('d', idf)
+
+    @classmethod
+    def from_list(cls, rows):
+        """Создает статистику из списка словарей {'word', 'tf', 'idf'}."""
+        return cls(
+            [row['word'] for row in rows],
+            [row['tf'] for row in rows],
+            [row['idf'] for row in rows]
+        )
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return zip(self.words, self.tf, self.idf)
+
+    def to_list(self):
+        """Возвращает статистику списком словарей {'word', 'tf', 'idf'}."""
+        return [
+            {'word': word, 'tf': tf, 'idf': idf}
+            for word, tf, idf in self
+        ]
+
+    def to_json(self):
+        """
+        Возвращает статистику JSON-массивом объектов {"word", "tf", "idf"}.
+
+        Результат совпадает с выводом JSONRenderer для to_list(): слова
+        экранируются кодировщиком модуля json, числа записываются через repr.
+        """
+        return '[' + ','.join([
+            f'{{"word":{encode_basestring(word)},"tf":{tf!r},"idf":{idf!r}}}'
+            for word, tf, idf in self
+        ]) + ']'
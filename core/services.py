@@ -1,203 +1,1245 @@
+from array import array
 from collections import Counter
-import re
+from datetime import timedelta
+from itertools import islice
+from operator import itemgetter
+import codecs
+import hashlib
+import heapq
 import math
-from .models import DocumentMetrics, CollectionMetrics
+import tarfile
+import zipfile
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import (
+    DocumentMetrics,
+    CollectionMetrics,
+    Collections,
+    CollectionTerm,
+    Document,
+    Posting,
+    StatisticsJob,
+    Term
+)
+from .cache import (
+    SizeLimitedCache,
+    pack_groups,
+    pack_mapping,
+    packed_get,
+    packed_group,
+    statistics_cache_key
+)
+from .constants import TAR_EXTENSIONS, VECTOR_TYPECODE
 from .decorators import metrics_decorator
+from .engines import get_engine
+from .metrics import aggregator
+from .results import WordStatistics
+from .huffman import (  # noqa: F401
+    MAX_CODE_LENGTH,
+    MAX_CODES,
+    MAX_DECODE_CODE_LENGTH,
+    HuffmanNode,
+    bits_to_bytes,
+    bytes_to_bits,
+    build_huffman_codes,
+    build_huffman_tree,
+    canonical_table,
+    codes_from_canonical_table,
+    counting_sort,
+    huffman_decode,
+    huffman_encode,
+    huffman_encode_packed
+)
+from .tokenizer import TokenPipeline, count_words_parallel, iter_tokens
 
+# Результаты кодирования Хаффмана по хешу содержимого документа
+huffman_cache = SizeLimitedCache(settings.HUFFMAN_CACHE_MAX_SIZE)
 
-def tokenize(text):
-    """Разбивает текст на токены (слова)."""
-    words = re.findall(r'\b\w+\b', text.lower())
+
+def calculate_tf(term_counts):
+    """Рассчитывает TF по частотам слов документа."""
+    total_words = sum(term_counts.values())
+
+    return {
+        term: count/total_words for term, count in term_counts.items()
+    }
+
+
+def _statistics_tfidf(row):
+    """Возвращает TF-IDF строки статистики (id слова, tf, idf)."""
+    return row[1] * row[2]
+
+
+STATISTICS_ORDER_KEYS = {
+    'tf': itemgetter(1),
+    'idf': itemgetter(2),
+    'tfidf': _statistics_tfidf,
+}
+
+
+def _select_rows(rows, k, key='tf', reverse=False):
+    """Выбирает k строк статистики кучей (см. top_words)."""
+    value = STATISTICS_ORDER_KEYS[key]
+    if reverse:
+        return heapq.nlargest(k, rows, key=lambda row: (value(row), -row[0]))
+    return heapq.nsmallest(k, rows, key=lambda row: (value(row), row[0]))
+
+
+def _word_statistics(selected, words):
+    """Собирает статистику из выбранных строк и слов {id слова: слово}."""
+    return WordStatistics(
+        [words[term_id] for term_id, _, _ in selected],
+        [tf for _, tf, _ in selected],
+        [idf for _, _, idf in selected]
+    )
+
+
+def top_words(rows, k, key='tf', reverse=False):
+    """
+    Выбирает k слов статистики без полной сортировки словаря.
+
+    Выбор выполняется кучей за O(n log k). Слова с равными значениями
+    упорядочиваются по id в словаре, то есть по порядку первого появления
+    слова, поэтому результат не зависит от порядка строк. Слова загружаются
+    из словаря только для выбранных строк.
+
+    Args:
+        rows: Итерируемый объект кортежей (id слова, tf, idf)
+        k: Количество слов
+        key: Ключ сортировки - 'tf', 'idf' или 'tfidf'
+        reverse: True - k наибольших значений, False - k наименьших
+
+    Returns:
+        WordStatistics: Статистика по k словам в порядке сортировки
+    """
+    selected = _select_rows(rows, k, key=key, reverse=reverse)
+    return _word_statistics(
+        selected,
+        term_words(term_id for term_id, _, _ in selected)
+    )
+
+
+def _chunks(items, size=1000):
+    """Разбивает список на части для запросов с большим IN."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def intern_terms(words):
+    """
+    Возвращает id слов в словаре, добавляя в него отсутствующие слова.
+
+    Отсутствующие слова вставляются в отсортированном порядке: параллельные
+    загрузки с общими новыми словами блокируют строки уникального индекса
+    в одном и том же порядке и не попадают во взаимную блокировку.
+
+    Returns:
+        dict: {слово: id} в порядке первого появления слова в words
+    """
+    words = list(dict.fromkeys(words))
+    ids = {}
+    for chunk in _chunks(words):
+        ids.update(Term.objects.filter(word__in=chunk).values_list('word', 'pk'))
+
+    missing = sorted(word for word in words if word not in ids)
+    if missing:
+        Term.objects.bulk_create(
+            (Term(word=word) for word in missing),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        for chunk in _chunks(missing):
+            ids.update(
+                Term.objects.filter(word__in=chunk).values_list('word', 'pk')
+            )
+    return {word: ids[word] for word in words}
+
+
+def term_words(term_ids):
+    """Возвращает слова для id из словаря."""
+    words = {}
+    for chunk in _chunks(list(term_ids)):
+        words.update(Term.objects.filter(pk__in=chunk).values_list('pk', 'word'))
     return words
 
 
-def calculate_tf(text):
-    """Рассчитывает TF для текста."""
-    words = tokenize(text)
-    word_count = Counter(words)
-    total_words = len(words)
+def build_term_vectors(texts):
+    """
+    Токенизирует тексты и упаковывает частоты их слов.
+
+    Слова всех текстов добавляются в словарь за один проход в
+    отсортированном порядке, поэтому id новых слов не зависят
+    от хеширования строк.
 
-    return {word: count/total_words for word, count in word_count.items()}
+    Returns:
+        list: Для каждого текста - поля документа term_ids и term_counts
+        (отсортированные по id слова массивы в бинарном виде) и
+        words_count (число слов)
+    """
+    with aggregator.stage('document_upload', 'tokenize'):
+        word_counts = count_words_parallel(
+            texts,
+            settings.TOKENIZE_WORKERS,
+            settings.TOKENIZE_PARALLEL_THRESHOLD,
+            settings.TOKENIZE_CHUNK_SIZE
+        )
+    ids = intern_terms(dict.fromkeys(
+        word for word_count in word_counts for word in word_count
+    ))
 
+    vectors = []
+    for word_count in word_counts:
+        pairs = sorted((ids[word], count) for word, count in word_count.items())
+        vectors.append({
+            'term_ids': array(
+                VECTOR_TYPECODE, [pk for pk, _ in pairs]
+            ).tobytes(),
+            'term_counts': array(
+                VECTOR_TYPECODE, [count for _, count in pairs]
+            ).tobytes(),
+            'words_count': sum(word_count.values()),
+        })
+    return vectors
 
-def calculate_idf(documents):
-    """Рассчитывает IDF для списка документов."""
 
-    doc_freq = Counter()
-    for doc in documents:
-        unique_words = set(tokenize(doc))
-        doc_freq.update(unique_words)
+def build_term_vector(text):
+    """Токенизирует текст и упаковывает частоты его слов (см. build_term_vectors)."""
+    return build_term_vectors([text])[0]
 
-    total_docs = len(documents)
-    return {
-        word: math.log(total_docs / count)
-        for word, count in doc_freq.items()
+
+def unpack_term_vector(term_ids, term_counts):
+    """Распаковывает вектор документа в словарь {id слова: частота}."""
+    ids = array(VECTOR_TYPECODE)
+    ids.frombytes(term_ids)
+    counts = array(VECTOR_TYPECODE)
+    counts.frombytes(term_counts)
+    return dict(zip(ids, counts))
+
+
+def collection_pipeline(collection):
+    """Возвращает конвейер обработки слов коллекции."""
+    return TokenPipeline(
+        stop_words=collection.stop_words,
+        stemming=collection.stemming,
+        min_length=collection.min_word_length
+    )
+
+
+def _process_terms(term_ids, pipeline, processed):
+    """
+    Обрабатывает слова конвейером и добавляет результаты в словарь.
+
+    Обработанные слова добавляются в словарь слов, если их там нет.
+
+    Args:
+        term_ids: id исходных слов
+        pipeline: Конвейер обработки слов
+        processed: Словарь {id исходного слова: id обработанного слова
+            или None}, дополняется словами, которых в нем нет
+    """
+    missing = [term_id for term_id in term_ids if term_id not in processed]
+    if not missing:
+        return
+    words = {
+        term_id: pipeline.process_word(word)
+        for term_id, word in term_words(missing).items()
     }
+    ids = intern_terms({word for word in words.values() if word is not None})
+    for term_id, word in words.items():
+        processed[term_id] = None if word is None else ids[word]
+
+
+def _process_vector(vector, processed):
+    """
+    Применяет результаты обработки слов (см. _process_terms) к вектору
+    {id слова: частота}.
+    """
+    counts = Counter()
+    for term_id, count in vector.items():
+        processed_id = processed[term_id]
+        if processed_id is not None:
+            counts[processed_id] += count
+    return counts
 
 
-@metrics_decorator(DocumentMetrics)
-def calculate_document_tfidf(document_text, collection_texts):
-    """Получает статистику по документу с учетом коллекции."""
-    tf = calculate_tf(document_text)
-    idf = calculate_idf(collection_texts)
+def _processed_vectors(rows, pipeline, processed):
+    """
+    Применяет конвейер обработки слов к векторам документов.
 
-    return [
-        {
-            'word': word,
-            'tf': tf[word],
-            'idf': idf[word]
-        }
-        for word in tf
-    ]
+    Слова загружаются из словаря порциями по STATISTICS_CHUNK_SIZE
+    документов, каждое слово - один раз.
 
+    Args:
+        rows: Итерируемый объект кортежей (id документа, term_ids, term_counts)
+        pipeline: Конвейер обработки слов
+        processed: Словарь результатов обработки слов (см. _process_terms)
 
-@metrics_decorator(CollectionMetrics)
-def calculate_collection_tfidf(collection_texts):
-    """Получает статистику по коллекции."""
-    combined_text = ' '.join(collection_texts)
-    tf = calculate_tf(combined_text)
-    idf = calculate_idf(collection_texts)
+    Yields:
+        tuple: (id документа, Counter частот по id обработанных слов)
+    """
+    rows = iter(rows)
+    while batch := list(islice(rows, settings.STATISTICS_CHUNK_SIZE)):
+        vectors = [
+            (document_id, unpack_term_vector(term_ids, term_counts))
+            for document_id, term_ids, term_counts in batch
+        ]
+        _process_terms(
+            {term_id for _, vector in vectors for term_id in vector},
+            pipeline,
+            processed
+        )
+        for document_id, vector in vectors:
+            yield document_id, _process_vector(vector, processed)
 
-    return [
-        {
-            'word': word,
-            'tf': tf[word],
-            'idf': idf[word]
+
+def _accumulate_vectors(documents, pipeline):
+    """
+    Суммирует векторы документов из QuerySet.
+
+    Документы читаются порциями через серверный курсор, поэтому расход памяти
+    ограничен размером словаря, а не объемом коллекции.
+
+    Returns:
+        tuple: (частоты слов, документные частоты, число документов,
+            число слов) по id слов после обработки конвейером
+    """
+    if pipeline.is_identity:
+        vectors = documents.values_list(
+            'term_ids', 'term_counts', 'words_count'
+        ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE)
+        return get_engine().accumulate(vectors)
+
+    term_counts = Counter()
+    doc_freq = Counter()
+    total_docs = 0
+    rows = documents.values_list(
+        'pk', 'term_ids', 'term_counts'
+    ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE)
+    for _, counts in _processed_vectors(rows, pipeline, {}):
+        term_counts.update(counts)
+        doc_freq.update(counts.keys())
+        total_docs += 1
+    return (
+        dict(term_counts),
+        dict(doc_freq),
+        total_docs,
+        sum(term_counts.values()),
+    )
+
+
+def create_postings(documents):
+    """Добавляет слова документов в индекс вхождений для поиска."""
+    Posting.objects.bulk_create(
+        (
+            Posting(term_id=term_id, document_id=document.pk, count=count)
+            for document in documents
+            for term_id, count in unpack_term_vector(
+                document.term_ids, document.term_counts
+            ).items()
+        ),
+        batch_size=1000
+    )
+
+
+def create_document(title, content, owner):
+    """Создает документ и добавляет его слова в индекс вхождений."""
+    with transaction.atomic():
+        document = Document.objects.create(
+            title=title,
+            content=content,
+            owner=owner,
+            **build_term_vector(content)
+        )
+        create_postings([document])
+    return document
+
+
+class UploadLimitError(Exception):
+    """Загрузка превышает ограничения UPLOAD_MAX_FILES или UPLOAD_MAX_*_SIZE."""
+
+
+class _LimitedReader:
+    """Поток, чтение из которого прерывается после max_size байт."""
+
+    def __init__(self, stream, max_size):
+        self.stream = stream
+        self.max_size = max_size
+        self.size = 0
+
+    def read(self, size):
+        chunk = self.stream.read(min(size, self.max_size - self.size + 1))
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            raise UploadLimitError
+        return chunk
+
+
+def _decode_stream(stream, chunk_size=65536):
+    """Декодирует поток байт в кодировке UTF-8 по частям."""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b'', final=True))
+    return ''.join(parts)
+
+
+def iter_uploaded_texts(files):
+    """
+    Перебирает текстовые файлы из загруженных файлов и архивов zip/tar.
+
+    Архивы читаются последовательно, каждый файл декодируется по частям,
+    поэтому в памяти находится только текущий файл. Количество файлов,
+    размер каждого файла и общий размер после распаковки ограничены
+    настройками UPLOAD_MAX_FILES, UPLOAD_MAX_FILE_SIZE и
+    UPLOAD_MAX_TOTAL_SIZE, чтение прерывается сразу после превышения.
+
+    Yields:
+        tuple: (имя файла, текст или None, сообщение об ошибке или None)
+
+    Raises:
+        UploadLimitError: если загрузка превышает ограничения
+    """
+    files_count = 0
+    total_size = 0
+
+    def read_text(name, stream):
+        nonlocal files_count, total_size
+        files_count += 1
+        if files_count > settings.UPLOAD_MAX_FILES:
+            raise UploadLimitError(
+                f'Загрузка содержит больше {settings.UPLOAD_MAX_FILES} файлов'
+            )
+        if not name.lower().endswith('.txt'):
+            return name, None, 'Файл должен быть в формате .txt'
+
+        max_size = min(
+            settings.UPLOAD_MAX_FILE_SIZE,
+            settings.UPLOAD_MAX_TOTAL_SIZE - total_size
+        )
+        reader = _LimitedReader(stream, max_size)
+        try:
+            return name, _decode_stream(reader), None
+        except UnicodeDecodeError:
+            return name, None, 'Файл должен быть в кодировке UTF-8'
+        except UploadLimitError:
+            if max_size == settings.UPLOAD_MAX_FILE_SIZE:
+                raise UploadLimitError(
+                    f'{name}: размер файла больше '
+                    f'{settings.UPLOAD_MAX_FILE_SIZE} байт'
+                ) from None
+            raise UploadLimitError(
+                'Общий размер файлов загрузки больше '
+                f'{settings.UPLOAD_MAX_TOTAL_SIZE} байт'
+            ) from None
+        finally:
+            total_size += reader.size
+
+    for file in files:
+        name = file.name.lower()
+        try:
+            if name.endswith('.zip'):
+                with zipfile.ZipFile(file) as archive:
+                    for info in archive.infolist():
+                        if not info.is_dir():
+                            with archive.open(info) as member:
+                                yield read_text(info.filename, member)
+            elif name.endswith(TAR_EXTENSIONS):
+                with tarfile.open(fileobj=file, mode='r|*') as archive:
+                    for info in archive:
+                        if info.isfile():
+                            yield read_text(
+                                info.name,
+                                archive.extractfile(info)
+                            )
+            else:
+                yield read_text(file.name, file)
+        except (zipfile.BadZipFile, tarfile.TarError, EOFError):
+            yield file.name, None, 'Некорректный архив'
+
+
+def content_hash(text):
+    """Возвращает хеш SHA-256 содержимого документа."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _document_title(name):
+    """Возвращает название документа по имени файла без пути и расширения."""
+    return name.rsplit('/', 1)[-1].rsplit('.', 1)[0][:255]
+
+
+def _create_documents_batch(batch, owner, collection):
+    """
+    Сохраняет пачку документов и добавляет их в коллекцию.
+
+    Args:
+        batch: список пар (результат для файла, текст)
+        owner: владелец документов
+        collection: коллекция или None
+    """
+    texts = [text for _, text in batch]
+    with transaction.atomic():
+        documents = Document.objects.bulk_create([
+            Document(
+                title=_document_title(result['name']),
+                content=text,
+                content_hash=content_hash(text),
+                owner=owner,
+                **vector
+            )
+            for (result, text), vector in zip(batch, build_term_vectors(texts))
+        ])
+        document_ids = [document.pk for document in documents]
+        create_postings(documents)
+        if collection is not None:
+            # bulk_create не отправляет m2m_changed, поэтому индекс
+            # коллекции обновляется явно
+            Document.collections.through.objects.bulk_create([
+                Document.collections.through(
+                    document_id=document_id,
+                    collections_id=collection.pk
+                )
+                for document_id in document_ids
+            ])
+            update_collection_index(
+                collection.pk,
+                Document.objects.filter(pk__in=document_ids),
+                1
+            )
+    for (result, _), document_id in zip(batch, document_ids):
+        result['id'] = document_id
+
+
+def bulk_create_documents(files, owner, collection=None):
+    """
+    Создает документы из загруженных файлов и архивов.
+
+    Документы сохраняются через bulk_create пачками по
+    BULK_UPLOAD_BATCH_SIZE, связи с коллекцией добавляются одним
+    bulk_create на пачку.
+
+    Args:
+        files: загруженные файлы .txt и архивы .zip/.tar с ними
+        owner: владелец документов
+        collection: коллекция, в которую добавляются документы, или None
+
+    Returns:
+        list: Для каждого файла словарь {'name', 'id'} или {'name', 'error'}
+        в порядке загрузки
+
+    Raises:
+        UploadLimitError: если загрузка превышает ограничения (см.
+            iter_uploaded_texts); уже сохраненные пачки откатываются
+    """
+    results = []
+    batch = []
+    with transaction.atomic():
+        for name, text, error in iter_uploaded_texts(files):
+            result = {'name': name}
+            results.append(result)
+            if error:
+                result['error'] = error
+                continue
+            batch.append((result, text))
+            if len(batch) >= settings.BULK_UPLOAD_BATCH_SIZE:
+                _create_documents_batch(batch, owner, collection)
+                batch = []
+        if batch:
+            _create_documents_batch(batch, owner, collection)
+    return results
+
+
+def update_collection_index(collection_id, documents, sign):
+    """
+    Применяет вклад документов к инвертированному индексу коллекции.
+
+    Счетчики обновляются приращениями, поэтому стоимость обновления
+    зависит только от словаря изменившихся документов.
+
+    Args:
+        collection_id: id коллекции, индекс которой обновляется
+        documents: QuerySet добавленных или удаляемых документов
+        sign: 1 при добавлении документов, -1 при удалении
+    """
+    collection = Collections.objects.only(
+        'stop_words', 'stemming', 'min_word_length'
+    ).get(pk=collection_id)
+    term_counts, doc_freq, total_docs, total_words = (
+        _accumulate_vectors(documents, collection_pipeline(collection))
+    )
+    if not total_docs:
+        return
+
+    # Группируем слова с одинаковым приращением, чтобы обойтись
+    # несколькими UPDATE вместо запроса на каждое слово
+    deltas = {}
+    for term_id, count in term_counts.items():
+        deltas.setdefault((doc_freq[term_id], count), []).append(term_id)
+
+    with transaction.atomic():
+        # Блокировка строки коллекции сериализует изменения ее индекса
+        list(
+            Collections.objects.select_for_update()
+            .filter(pk=collection_id)
+            .values_list('pk')
+        )
+        terms = CollectionTerm.objects.filter(collection_id=collection_id)
+        if sign > 0:
+            CollectionTerm.objects.bulk_create(
+                (
+                    CollectionTerm(collection_id=collection_id, term_id=term_id)
+                    for term_id in term_counts
+                ),
+                batch_size=1000,
+                ignore_conflicts=True
+            )
+
+        for (df, tf), term_ids in deltas.items():
+            for chunk in _chunks(term_ids):
+                terms.filter(term_id__in=chunk).update(
+                    doc_freq=F('doc_freq') + sign * df,
+                    term_freq=F('term_freq') + sign * tf
+                )
+
+        if sign < 0:
+            for chunk in _chunks(list(term_counts)):
+                terms.filter(term_id__in=chunk, doc_freq=0).delete()
+
+        Collections.objects.filter(pk=collection_id).update(
+            documents_count=F('documents_count') + sign * total_docs,
+            total_words=F('total_words') + sign * total_words,
+            version=F('version') + 1
+        )
+
+
+def rebuild_collection_index(collection):
+    """Полностью перестраивает инвертированный индекс коллекции."""
+    term_counts, doc_freq, total_docs, total_words = _accumulate_vectors(
+        collection.documents.all(),
+        collection_pipeline(collection)
+    )
+
+    with transaction.atomic():
+        Collections.objects.select_for_update().get(pk=collection.pk)
+        collection.terms.all().delete()
+        CollectionTerm.objects.bulk_create(
+            (
+                CollectionTerm(
+                    collection=collection,
+                    term_id=term_id,
+                    doc_freq=doc_freq[term_id],
+                    term_freq=count
+                )
+                for term_id, count in term_counts.items()
+            ),
+            batch_size=1000
+        )
+        Collections.objects.filter(pk=collection.pk).update(
+            documents_count=total_docs,
+            total_words=total_words,
+            version=F('version') + 1
+        )
+
+
+def calculate_document_tfidf(
+    document, collections, k, key='tf', reverse=False
+):
+    """
+    Получает статистику по документу для всех его коллекций за один проход.
+
+    Частоты слов документа обрабатываются один раз для каждого набора
+    настроек конвейера, документные частоты его слов во всех коллекциях
+    загружаются одним запросом к индексу. Расчет ведется по id слов,
+    сами слова загружаются одним запросом только для выбранных k строк
+    всех коллекций.
+
+    Args:
+        document: Документ
+        collections: Коллекции, в которые входит документ
+        k, key, reverse: Параметры выбора слов (см. top_words)
+
+    Returns:
+        dict: {id коллекции: WordStatistics по k словам}
+    """
+    endpoint = DocumentMetrics.endpoint
+    with aggregator.stage(endpoint, 'db_fetch'):
+        vector = unpack_term_vector(document.term_ids, document.term_counts)
+
+        counts = {}
+        vectors = {}
+        for collection in collections:
+            config = (
+                collection.stop_words,
+                collection.stemming,
+                collection.min_word_length
+            )
+            if config not in vectors:
+                pipeline = collection_pipeline(collection)
+                if pipeline.is_identity:
+                    vectors[config] = vector
+                else:
+                    processed = {}
+                    _process_terms(vector, pipeline, processed)
+                    vectors[config] = _process_vector(vector, processed)
+            counts[collection.id] = vectors[config]
+
+        doc_freq = {collection.id: {} for collection in collections}
+        for chunk in _chunks(list(set().union(*vectors.values()))):
+            terms = CollectionTerm.objects.filter(
+                collection__in=list(doc_freq),
+                term_id__in=chunk
+            ).values_list('collection_id', 'term_id', 'doc_freq')
+            for collection_id, term_id, freq in terms:
+                doc_freq[collection_id][term_id] = freq
+
+    engine = get_engine()
+    with aggregator.stage(endpoint, 'idf'):
+        rows = {}
+        for collection in collections:
+            collection_counts = counts[collection.id]
+            term_ids = list(collection_counts)
+            rows[collection.id] = zip(
+                term_ids,
+                engine.tf(
+                    list(collection_counts.values()),
+                    sum(collection_counts.values())
+                ),
+                engine.idf(
+                    [doc_freq[collection.id][term_id] for term_id in term_ids],
+                    collection.documents_count
+                )
+            )
+
+    with aggregator.stage(endpoint, 'top_k'):
+        selected = {
+            collection_id: _select_rows(
+                collection_rows,
+                k,
+                key=key,
+                reverse=reverse
+            )
+            for collection_id, collection_rows in rows.items()
+        }
+        # Слова выбранных строк всех коллекций загружаются одним запросом
+        words = term_words({
+            term_id
+            for collection_rows in selected.values()
+            for term_id, _, _ in collection_rows
+        })
+        return {
+            collection_id: _word_statistics(collection_rows, words)
+            for collection_id, collection_rows in selected.items()
         }
-        for word in tf
+
+
+def calculate_collection_tfidf(collection, k, key='tf', reverse=False):
+    """Получает k слов статистики по коллекции из ее индекса."""
+    endpoint = CollectionMetrics.endpoint
+    term_ids = array(VECTOR_TYPECODE)
+    term_freqs = []
+    doc_freqs = []
+    with aggregator.stage(endpoint, 'db_fetch'):
+        terms = collection.terms.order_by('term_id').values_list(
+            'term_id', 'term_freq', 'doc_freq'
+        ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE)
+        for term_id, term_freq, doc_freq in terms:
+            term_ids.append(term_id)
+            term_freqs.append(term_freq)
+            doc_freqs.append(doc_freq)
+
+    engine = get_engine()
+    with aggregator.stage(endpoint, 'idf'):
+        tf = engine.tf(term_freqs, collection.total_words)
+        idf = engine.idf(doc_freqs, collection.documents_count)
+
+    with aggregator.stage(endpoint, 'top_k'):
+        return top_words(
+            zip(term_ids, tf, idf),
+            k,
+            key=key,
+            reverse=reverse
+        )
+
+
+def _document_collections_size(document, collections, *args, **kwargs):
+    """Возвращает размер наибольшей из коллекций документа."""
+    return max(collection.documents_count for collection in collections)
+
+
+def _collection_size(collection, *args, **kwargs):
+    """Возвращает размер коллекции."""
+    return collection.documents_count
+
+
+@metrics_decorator(
+    DocumentMetrics,
+    collection_size=_document_collections_size
+)
+def cached_document_tfidf(
+    document, collections, k, key='tf', reverse=False
+):
+    """
+    Возвращает статистику по документу из кеша, досчитывая недостающее.
+
+    Ключ кеша включает версию коллекции, поэтому после изменения ее состава
+    статистика рассчитывается заново.
+    """
+    cache_keys = {
+        collection.id: statistics_cache_key(
+            'document', document.id, collection.id, collection.version,
+            k, key, reverse
+        )
+        for collection in collections
+    }
+    cached = cache.get_many(list(cache_keys.values()))
+    result = {
+        collection_id: cached[cache_key]
+        for collection_id, cache_key in cache_keys.items()
+        if cache_key in cached
+    }
+    missing = [
+        collection for collection in collections
+        if collection.id not in result
     ]
+    aggregator.record_cache_access(
+        DocumentMetrics,
+        hits=len(result),
+        misses=len(missing)
+    )
 
+    if missing:
+        computed = calculate_document_tfidf(
+            document, missing, k, key=key, reverse=reverse
+        )
+        cache.set_many({
+            cache_keys[collection_id]: stats
+            for collection_id, stats in computed.items()
+        })
+        result.update(computed)
+    return result
 
-class HuffmanNode:
-    """Узел дерева Хаффмана."""
-    def __init__(self, char=None, freq=0):
-        self.char = char
-        self.freq = freq
-        self.left = None
-        self.right = None
 
-    def __lt__(self, other):
-        return self.freq < other.freq
+@metrics_decorator(CollectionMetrics, collection_size=_collection_size)
+def cached_collection_tfidf(collection, k, key='tf', reverse=False):
+    """Возвращает статистику по коллекции из кеша или рассчитывает ее."""
+    cache_key = statistics_cache_key(
+        'collection', collection.id, collection.version, k, key, reverse
+    )
+    stats = cache.get(cache_key)
+    aggregator.record_cache_access(
+        CollectionMetrics,
+        hits=int(stats is not None),
+        misses=int(stats is None)
+    )
 
-    def __str__(self):
-        return f"({self.char}, {self.freq})"
+    if stats is None:
+        stats = calculate_collection_tfidf(
+            collection, k, key=key, reverse=reverse
+        )
+        cache.set(cache_key, stats)
+    return stats
 
 
-def counting_sort(nodes):
+def enqueue_collection_statistics(collection, k, key='tf', reverse=False):
     """
-    Сортировка подсчетом для списка HuffmanNode по частоте (freq).
+    Возвращает готовую статистику по коллекции или ставит задание на расчет.
+
+    Готовая статистика берется из кеша или из выполненного задания для
+    текущей версии коллекции, иначе создается (или переиспользуется)
+    задание в очереди.
+
+    Returns:
+        tuple: (статистика или None, задание или None)
     """
-    if not nodes:
-        return []
+    cache_key = statistics_cache_key(
+        'collection', collection.id, collection.version, k, key, reverse
+    )
+    stats = cache.get(cache_key)
+    if stats is not None:
+        return stats, None
 
-    max_freq = max(node.freq for node in nodes)
-    count = [0] * (max_freq + 1)
+    job = StatisticsJob.objects.filter(
+        collection=collection,
+        collection_version=collection.version,
+        words_limit=k,
+        order_key=key,
+        reverse=reverse
+    ).exclude(status=StatisticsJob.Status.FAILED).order_by('-id').first()
+    if job is None:
+        job = StatisticsJob.objects.create(
+            collection=collection,
+            collection_version=collection.version,
+            words_limit=k,
+            order_key=key,
+            reverse=reverse
+        )
+    elif job.status == StatisticsJob.Status.DONE:
+        stats = WordStatistics.from_list(job.result)
+        cache.set(cache_key, stats)
+        return stats, job
+    return None, job
 
-    for node in nodes:
-        count[node.freq] += 1
 
-    for i in range(1, len(count)):
-        count[i] += count[i - 1]
+def claim_statistics_job():
+    """
+    Забирает из очереди следующее задание на расчет статистики.
 
-    result = [None] * len(nodes)
+    Задания, выполнение которых не завершилось за STATISTICS_JOB_TIMEOUT
+    секунд (например, из-за остановки обработчика), выдаются повторно.
+    """
+    stale = timezone.now() - timedelta(
+        seconds=settings.STATISTICS_JOB_TIMEOUT
+    )
+    with transaction.atomic():
+        job = (
+            StatisticsJob.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status=StatisticsJob.Status.PENDING)
+                | Q(status=StatisticsJob.Status.RUNNING, started_at__lt=stale)
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = StatisticsJob.Status.RUNNING
+        job.started_at = timezone.now()
+        job.save(update_fields=('status', 'started_at'))
+    return job
 
-    for node in reversed(nodes):
-        count[node.freq] -= 1
-        result[count[node.freq]] = node
 
-    return result
+def run_statistics_job(job):
+    """Рассчитывает статистику по заданию и сохраняет результат."""
+    try:
+        collection = Collections.objects.get(pk=job.collection_id)
+        job.result = cached_collection_tfidf(
+            collection,
+            job.words_limit,
+            key=job.order_key,
+            reverse=job.reverse
+        ).to_list()
+        job.collection_version = collection.version
+        job.status = StatisticsJob.Status.DONE
+    except Collections.DoesNotExist:
+        return
+    except Exception as error:
+        job.status = StatisticsJob.Status.FAILED
+        job.error = str(error)
 
+    job.finished_at = timezone.now()
+    job.save(update_fields=(
+        'result', 'collection_version', 'status', 'error', 'finished_at'
+    ))
+    if job.status == StatisticsJob.Status.DONE:
+        # Результаты для прежних версий коллекции больше не понадобятся
+        StatisticsJob.objects.filter(
+            collection_id=job.collection_id,
+            collection_version__lt=job.collection_version,
+            status__in=(StatisticsJob.Status.DONE, StatisticsJob.Status.FAILED)
+        ).delete()
 
-def build_huffman_tree(text):
-    """Создает дерево Хаффмана из текста."""
-    if not text:
-        return None
 
-    freq_dict = {}
-    for char in text:
-        freq_dict[char] = freq_dict.get(char, 0) + 1
+def cached_huffman_encoding(document, max_length=None):
+    """
+    Возвращает результат кодирования Хаффмана для документа из кеша.
 
-    if len(freq_dict) == 1:
-        char = list(freq_dict.keys())[0]
-        return HuffmanNode(char=char, freq=freq_dict[char])
+    Содержимое документа не меняется после загрузки, поэтому результат
+    кешируется по хешу содержимого; при промахе содержимое загружается
+    и кодируется.
 
-    nodes = [HuffmanNode(char=char, freq=freq) 
-             for char, freq in freq_dict.items()]
+    Returns:
+        tuple: (байты, количество значащих бит, словарь кодов)
+    """
+    cache_key = (document.content_hash, max_length)
+    encoding = huffman_cache.get(cache_key)
+    if encoding is None:
+        encoding = huffman_encode_packed(document.content, max_length)
+        data, _, codes = encoding
+        huffman_cache.set(
+            cache_key,
+            encoding,
+            len(data) + sum(len(code) + 1 for code in codes.values())
+        )
+    return encoding
 
-    n = len(nodes)
-    sorted_nodes = counting_sort(nodes)
-    sum_nodes = [HuffmanNode(char=None, freq=float('inf'))] * (n - 1)
 
-    i = 0  # указатель на текущий узел в sorted_nodes
-    j = 0  # указатель на текущий узел в sum_nodes
-    k = 0  # указатель на место для нового суммированного узла
+def collection_term_map(collection, pipeline):
+    """
+    Сопоставляет слова индекса коллекции с исходными словами документов.
 
-    while i < n - 1 or j < k:
-        min1 = min2 = None
+    Индекс вхождений хранит исходные слова документов, а индекс коллекции -
+    слова после обработки, поэтому для коллекций с конвейером соответствие
+    рассчитывается одним проходом по векторам документов для текущей версии
+    коллекции и кешируется в виде массивов (см. pack_groups, pack_mapping).
 
-        if i < n and (j >= k or sorted_nodes[i].freq <= sum_nodes[j].freq):
-            min1 = sorted_nodes[i]
-            i += 1
-        elif j < k:
-            min1 = sum_nodes[j]
-            j += 1
-        else:
-            break
+    Returns:
+        tuple: ({id слова индекса: id исходных слов},
+            {id документа: число слов после обработки}) в упакованном виде
+    """
+    cache_key = statistics_cache_key(
+        'terms', collection.id, collection.version
+    )
+    term_map = cache.get(cache_key)
+    if term_map is not None:
+        return term_map
 
-        if i < n and (j >= k or sorted_nodes[i].freq <= sum_nodes[j].freq):
-            min2 = sorted_nodes[i]
-            i += 1
-        elif j < k:
-            min2 = sum_nodes[j]
-            j += 1
-        else:
-            break
+    processed = {}
+    rows = collection.documents.values_list(
+        'pk', 'term_ids', 'term_counts'
+    ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE)
+    lengths = {
+        document_id: sum(counts.values())
+        for document_id, counts in _processed_vectors(rows, pipeline, processed)
+    }
+    terms = {}
+    for term_id, processed_id in processed.items():
+        if processed_id is not None:
+            terms.setdefault(processed_id, []).append(term_id)
+    term_map = (pack_groups(terms), pack_mapping(lengths, VECTOR_TYPECODE))
+    cache.set(cache_key, term_map)
+    return term_map
 
-        new_node = HuffmanNode(char=None, freq=min1.freq + min2.freq)
-        new_node.left = min1
-        new_node.right = min2
 
-        sum_nodes[k] = new_node
-        k += 1
+def _source_terms(term_ids, collection, pipeline):
+    """
+    Возвращает исходные слова документов для слов индекса коллекции.
 
-    return sum_nodes[k-1] if k > 0 else sorted_nodes[0]
+    Returns:
+        tuple: ({id исходного слова: id слова индекса}, число слов
+            документов после обработки в упакованном виде или None, если
+            конвейер не меняет слова)
+    """
+    if pipeline.is_identity:
+        return {term_id: term_id for term_id in term_ids}, None
+    terms, lengths = collection_term_map(collection, pipeline)
+    return {
+        source_id: term_id
+        for term_id in term_ids
+        for source_id in packed_group(terms, term_id)
+    }, lengths
 
 
-def build_huffman_codes(root):
-    """Создает словарь с кодами Хаффмана для каждого символа."""
-    codes = {}
-    if root is None:
-        return codes
+def search_collection(collection, query, k):
+    """
+    Ищет документы коллекции по запросу и ранжирует их по TF-IDF.
 
-    if root.char is not None and root.left is None and root.right is None:
-        codes[root.char] = "0"
-        return codes
+    Из индекса вхождений читаются только записи слов запроса, поэтому
+    время поиска зависит от частоты этих слов, а не от размера коллекции.
+    Оценка документа - сумма TF-IDF слов запроса с учетом их повторов
+    в запросе. Запрос обрабатывается конвейером коллекции.
 
-    stack = [(root, "")]
+    Args:
+        collection: Коллекция
+        query: Текст запроса
+        k: Количество документов в результате
 
-    while stack:
-        node, code = stack.pop()
+    Returns:
+        list: [{'document_id', 'title', 'score'}] по убыванию оценки
+    """
+    endpoint = 'collection_search'
+    pipeline = collection_pipeline(collection)
+    query_counts = Counter(pipeline.process(iter_tokens(query)))
+    if not query_counts or not collection.documents_count:
+        return []
+
+    with aggregator.stage(endpoint, 'db_fetch'):
+        query_terms = dict(
+            Term.objects.filter(word__in=list(query_counts))
+            .values_list('pk', 'word')
+        )
+        doc_freq = dict(
+            collection.terms.filter(term_id__in=list(query_terms))
+            .values_list('term_id', 'doc_freq')
+        )
+        if not doc_freq:
+            return []
+        term_ids, lengths = _source_terms(doc_freq, collection, pipeline)
+        postings = Posting.objects.filter(
+            term_id__in=list(term_ids),
+            document__collections=collection
+        ).values_list(
+            'document_id', 'term_id', 'count', 'document__words_count'
+        )
+
+        weights = {
+            source_id: query_counts[query_terms[term_id]] * math.log(
+                collection.documents_count / doc_freq[term_id]
+            )
+            for source_id, term_id in term_ids.items()
+        }
+        scores = {}
+        for document_id, term_id, count, words_count in postings.iterator(
+            chunk_size=settings.STATISTICS_CHUNK_SIZE
+        ):
+            if lengths is not None:
+                words_count = packed_get(lengths, document_id)
+            scores[document_id] = (
+                scores.get(document_id, 0.0)
+                + count / words_count * weights[term_id]
+            )
+
+    with aggregator.stage(endpoint, 'top_k'):
+        best = heapq.nlargest(
+            k, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        titles = dict(
+            Document.objects.filter(pk__in=[pk for pk, _ in best])
+            .values_list('pk', 'title')
+        )
+    return [
+        {'document_id': pk, 'title': titles[pk], 'score': score}
+        for pk, score in best
+    ]
+
+
+def collection_document_norms(collection, pipeline):
+    """
+    Возвращает L2-нормы TF-IDF векторов документов коллекции.
+
+    Нормы зависят от IDF, то есть от состава коллекции, поэтому
+    рассчитываются одним проходом по векторам документов для текущей
+    версии коллекции и кешируются в виде массивов (см. pack_mapping).
 
-        if node.char is not None:
-            codes[node.char] = code
-            continue
+    Returns:
+        tuple: {id документа: норма} в упакованном виде
+    """
+    cache_key = statistics_cache_key(
+        'norms', collection.id, collection.version
+    )
+    norms = cache.get(cache_key)
+    if norms is not None:
+        return norms
 
-        if node.right:
-            stack.append((node.right, code + "1"))
+    idf = {
+        term_id: math.log(collection.documents_count / doc_freq)
+        for term_id, doc_freq in collection.terms.values_list(
+            'term_id', 'doc_freq'
+        ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE)
+    }
+    norms = {}
+    if pipeline.is_identity:
+        vectors = (
+            (document_id, unpack_term_vector(term_ids, term_counts))
+            for document_id, term_ids, term_counts
+            in collection.documents.values_list(
+                'pk', 'term_ids', 'term_counts'
+            ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE)
+        )
+    else:
+        vectors = _processed_vectors(
+            collection.documents.values_list(
+                'pk', 'term_ids', 'term_counts'
+            ).iterator(chunk_size=settings.STATISTICS_CHUNK_SIZE),
+            pipeline,
+            {}
+        )
+    for document_id, vector in vectors:
+        norms[document_id] = math.sqrt(sum(
+            (count * idf.get(term_id, 0.0)) ** 2
+            for term_id, count in vector.items()
+        )) / (sum(vector.values()) or 1)
+    norms = pack_mapping(norms, 'd')
+    cache.set(cache_key, norms)
+    return norms
 
-        if node.left:
-            stack.append((node.left, code + "0"))
 
-    return codes
+def similar_documents(document, collection, k):
+    """
+    Ищет документы коллекции, наиболее похожие на документ.
 
+    Сходство - косинус угла между TF-IDF векторами документов (IDF по
+    коллекции, слова обработаны ее конвейером). Скалярные произведения
+    накапливаются по индексу вхождений только для документов, имеющих
+    общие с исходным слова; слова, которые есть во всех документах
+    коллекции (IDF = 0), не учитываются. Нормы векторов берутся из
+    collection_document_norms.
 
-def huffman_encode(text):
-    """Кодирует текст с помощью алгоритма Хаффмана."""
-    if not text:
-        return "", {}
+    Args:
+        document: Исходный документ
+        collection: Коллекция, среди документов которой ведется поиск
+        k: Количество документов в результате
 
-    tree = build_huffman_tree(text)
-    codes = build_huffman_codes(tree)
-    encoded = "".join(codes[char] for char in text)
+    Returns:
+        list: [{'document_id', 'title', 'score'}] по убыванию сходства
+    """
+    endpoint = 'document_similar'
+    total_docs = collection.documents_count
+    if not total_docs:
+        return []
 
-    return encoded, codes
+    pipeline = collection_pipeline(collection)
+    with aggregator.stage(endpoint, 'db_fetch'):
+        vector = unpack_term_vector(document.term_ids, document.term_counts)
+        if not pipeline.is_identity:
+            processed = {}
+            _process_terms(vector, pipeline, processed)
+            vector = _process_vector(vector, processed)
+        if not vector:
+            return []
+        tf = calculate_tf(vector)
+        doc_freq = {}
+        for chunk in _chunks(list(tf)):
+            doc_freq.update(
+                collection.terms.filter(term_id__in=chunk)
+                .values_list('term_id', 'doc_freq')
+            )
+        idf = {
+            term_id: math.log(total_docs / doc_freq[term_id])
+            for term_id in tf
+            if doc_freq.get(term_id, total_docs) < total_docs
+        }
+        if not idf:
+            return []
+        norms = collection_document_norms(collection, pipeline)
+
+        # Вклад слова в скалярное произведение: tf * idf исходного
+        # документа, умноженное на idf (tf второго документа - из индекса)
+        factors = {
+            term_id: tf[term_id] * term_idf * term_idf
+            for term_id, term_idf in idf.items()
+        }
+        term_ids, lengths = _source_terms(factors, collection, pipeline)
+        scores = {}
+        for chunk in _chunks(list(term_ids)):
+            postings = Posting.objects.filter(
+                term_id__in=chunk,
+                document__collections=collection
+            ).exclude(document_id=document.pk).values_list(
+                'document_id', 'term_id', 'count', 'document__words_count'
+            )
+            for document_id, term_id, count, words_count in postings.iterator(
+                chunk_size=settings.STATISTICS_CHUNK_SIZE
+            ):
+                if lengths is not None:
+                    words_count = packed_get(lengths, document_id)
+                scores[document_id] = (
+                    scores.get(document_id, 0.0)
+                    + factors[term_ids[term_id]] * count / words_count
+                )
+
+    with aggregator.stage(endpoint, 'top_k'):
+        query_norm = math.sqrt(sum(
+            (tf[term_id] * term_idf) ** 2 for term_id, term_idf in idf.items()
+        ))
+        similarities = (
+            (document_id, score / (query_norm * norm))
+            for document_id, score in scores.items()
+            if (norm := packed_get(norms, document_id))
+        )
+        best = heapq.nlargest(
+            k, similarities, key=lambda item: (item[1], -item[0])
+        )
+        titles = dict(
+            Document.objects.filter(pk__in=[pk for pk, _ in best])
+            .values_list('pk', 'title')
+        )
+    return [
+        {'document_id': pk, 'title': titles[pk], 'score': score}
+        for pk, score in best
+    ]
@@ -0,0 +1,66 @@
+from django.db.models.signals import m2m_changed, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Document
+from .services import content_hash, update_collection_index
+
+
+@receiver(pre_save, sender=Document)
+def set_content_hash(sender, instance, **kwargs):
+    """Рассчитывает хеш содержимого документа перед сохранением."""
+    if 'content' not in instance.get_deferred_fields():
+        instance.content_hash = content_hash(instance.content)
+
+
+@receiver(m2m_changed, sender=Document.collections.through)
+def update_index_on_membership_change(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    """
+    Обновляет индексы коллекций при изменении их состава.
+
+    Срабатывает для обеих сторон связи: collection.documents.add()/remove()
+    и document.collections.add()/remove(), в том числе из админки.
+    """
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+
+    if reverse:
+        own_field, other_field = 'collections_id', 'document_id'
+    else:
+        own_field, other_field = 'document_id', 'collections_id'
+
+    if action != 'post_add':
+        # Для remove/clear учитываем только реально связанные объекты
+        members = sender.objects.filter(**{own_field: instance.pk})
+        if pk_set is not None:
+            members = members.filter(**{f'{other_field}__in': pk_set})
+        pk_set = set(members.values_list(other_field, flat=True))
+
+    if not pk_set:
+        return
+
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        update_collection_index(
+            instance.pk,
+            Document.objects.filter(pk__in=pk_set),
+            sign
+        )
+    else:
+        for collection_id in pk_set:
+            update_collection_index(
+                collection_id,
+                Document.objects.filter(pk=instance.pk),
+                sign
+            )
+
+
+@receiver(pre_delete, sender=Document)
+def update_index_on_document_delete(sender, instance, **kwargs):
+    """Удаляет документ из индексов коллекций перед его удалением."""
+    for collection_id in instance.collections.values_list('pk', flat=True):
+        update_collection_index(
+            collection_id,
+            Document.objects.filter(pk=instance.pk),
+            -1
+        )
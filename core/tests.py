@@ -0,0 +1,381 @@
+import os
+import random
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from .benchmarks import synthetic_vectors
+from .engines import NumpyEngine, PythonEngine
+from .huffman import (
+    MAX_CODE_LENGTH,
+    MAX_CODES,
+    MAX_DECODE_CODE_LENGTH,
+    bits_to_bytes,
+    bytes_to_bits,
+    canonical_table,
+    codes_from_canonical_table,
+    huffman_decode,
+    huffman_encode,
+    huffman_encode_packed,
+    pack_bits,
+)
+from .metrics import HISTOGRAM_BOUNDS, MetricsAggregator, latency_summary
+from users.models import MyUser
+from .models import Collections, Document, DocumentMetrics, MetricsHistogram, Term
+from .services import (
+    bulk_create_documents,
+    intern_terms,
+    rebuild_collection_index,
+)
+
+ALPHABETS = (
+    'ab',
+    'abcdefghijklmnopqrstuvwxyz ',
+    'абвгдеёжзийклмнопрстуфхцчшщъыьэюя .,!?\n',
+    'aé中\U0001f600',
+)
+
+
+def random_texts(count=200, seed=0):
+    """
+    Генерирует случайные тексты для проверки свойств кодека.
+
+    Частоты символов случайны, поэтому среди текстов есть тексты с
+    равномерным и с сильно неравномерным распределением символов,
+    в том числе из одного символа.
+    """
+    rng = random.Random(seed)
+    yield 'a'
+    yield 'a' * 1000
+    for _ in range(count):
+        alphabet = rng.choice(ALPHABETS)
+        weights = [rng.random() ** 8 for _ in alphabet]
+        length = rng.choice((1, 2, 7, 8, 9, 100, 5000))
+        yield ''.join(rng.choices(alphabet, weights, k=length))
+
+
+class HuffmanRoundTripTest(SimpleTestCase):
+    """Свойства кодирования и декодирования кода Хаффмана."""
+
+    def test_packed_round_trip(self):
+        for max_length in (None, MAX_CODE_LENGTH, 4):
+            for text in random_texts():
+                with self.subTest(text=text[:20], max_length=max_length):
+                    data, bit_length, codes = huffman_encode_packed(
+                        text, max_length
+                    )
+                    self.assertEqual(len(data), -(-bit_length // 8))
+                    self.assertEqual(
+                        huffman_decode(data, bit_length, codes), text
+                    )
+                    if max_length is not None:
+                        # Код длины max_length вмещает не более
+                        # 2 ** max_length символов
+                        self.assertLessEqual(
+                            max(map(len, codes.values())),
+                            max(max_length, (len(codes) - 1).bit_length())
+                        )
+
+    def test_canonical_table_round_trip(self):
+        for text in random_texts():
+            with self.subTest(text=text[:20]):
+                data, bit_length, codes = huffman_encode_packed(
+                    text, MAX_CODE_LENGTH
+                )
+                restored = codes_from_canonical_table({
+                    str(length): chars
+                    for length, chars in canonical_table(codes).items()
+                })
+                self.assertEqual(restored, codes)
+                self.assertEqual(
+                    huffman_decode(data, bit_length, restored), text
+                )
+
+    def test_bit_string_matches_packed_bits(self):
+        for text in random_texts(count=50):
+            with self.subTest(text=text[:20]):
+                encoded, codes = huffman_encode(text)
+                data, bit_length = pack_bits(text, codes)
+                self.assertEqual(bits_to_bytes(encoded), (data, bit_length))
+                self.assertEqual(bytes_to_bits(data, bit_length), encoded)
+                self.assertEqual(
+                    pack_bits(text, codes, chunk_size=3),
+                    (data, bit_length)
+                )
+
+    def test_empty_text(self):
+        self.assertEqual(huffman_encode_packed(''), (b'', 0, {}))
+        self.assertEqual(huffman_decode(b'', 0, {}), '')
+
+    def test_invalid_input(self):
+        codes = {'a': '0', 'b': '10', 'c': '11'}
+        with self.assertRaises(ValueError):
+            huffman_decode(b'\x00', 9, codes)
+        # Последний код не завершен
+        with self.assertRaises(ValueError):
+            huffman_decode(b'\x80', 1, codes)
+        with self.assertRaises(ValueError):
+            huffman_decode(b'', 0, {'a': '0', 'b': '01'})
+        with self.assertRaises(ValueError):
+            huffman_decode(b'', 0, {'a': '0', 'b': '0\n'})
+        for bits in ('0101\n', ' 0101', '01_01', '012'):
+            with self.assertRaises(ValueError):
+                bits_to_bytes(bits)
+
+    def test_canonical_table_limits(self):
+        for table in (
+            {'50000000': 'a', '1': 'b'},
+            {str(MAX_CODE_LENGTH + 1): 'a', '1': 'b'},
+            {'0': 'a'},
+            {'-1': 'a'},
+            {str(MAX_CODE_LENGTH): ''.join(map(chr, range(MAX_CODES + 1)))},
+        ):
+            with self.subTest(table={k: v[:5] for k, v in table.items()}):
+                with self.assertRaises(ValueError):
+                    codes_from_canonical_table(table)
+
+    def test_decoder_limits(self):
+        # Полный код с самым длинным допустимым кодом
+        codes = {
+            str(length): '0' * (length - 1) + '1'
+            for length in range(1, MAX_DECODE_CODE_LENGTH)
+        }
+        codes['0'] = '0' * MAX_DECODE_CODE_LENGTH
+        self.assertEqual(huffman_decode(b'\x00' * 6, 48, codes), '0')
+
+        for codes in (
+            {'a': '1', 'b': '0' * (MAX_DECODE_CODE_LENGTH + 1)},
+            {
+                chr(index): format(index, '016b')
+                for index in range(MAX_CODES + 1)
+            },
+            # Неполные префиксные коды: узлы без второго потомка
+            {'a': '0' * 40 + '1', 'b': '1'},
+            {'a': '00', 'b': '11'},
+        ):
+            with self.subTest(codes=list(codes.items())[:2]):
+                with self.assertRaises(ValueError):
+                    huffman_decode(b'', 0, codes)
+
+
+class MetricsAggregatorTest(TestCase):
+    """Сброс накопленных метрик в БД."""
+
+    def setUp(self):
+        self.aggregator = MetricsAggregator()
+        # Сброс вызывается тестом, фоновый поток не запускается
+        self.aggregator.flusher_pid = os.getpid()
+
+    def record(self, times):
+        for execution_time in times:
+            self.aggregator.record(DocumentMetrics, execution_time, 10)
+            self.aggregator.record_cache_access(DocumentMetrics, misses=1)
+
+    def assert_flushed(self, times):
+        metrics = DocumentMetrics.objects.get(pk=1)
+        self.assertEqual(metrics.statistics_requests, len(times))
+        self.assertEqual(metrics.cache_misses, len(times))
+        self.assertAlmostEqual(metrics.max_time_processed, max(times))
+        self.assertAlmostEqual(metrics.min_time_processed, min(times))
+
+        bounds = HISTOGRAM_BOUNDS['latency']
+        expected = [0] * (len(bounds) + 1)
+        for execution_time in times:
+            index = sum(bound < execution_time for bound in bounds)
+            expected[index] += 1
+        histogram = MetricsHistogram.objects.get(
+            metric='latency',
+            endpoint=DocumentMetrics.endpoint
+        )
+        self.assertEqual(histogram.buckets, expected)
+        self.assertEqual(histogram.count, len(times))
+        self.assertEqual(
+            latency_summary(DocumentMetrics.endpoint)['count'], len(times)
+        )
+
+    def test_flush_accumulates(self):
+        self.record([0.01, 0.2])
+        self.aggregator.flush()
+        self.record([0.05, 3.0, 0.2])
+        # Повторный сброс: два UPDATE на гистограмму и один на счетчики,
+        # без SELECT ... FOR UPDATE
+        with CaptureQueriesContext(connection) as queries:
+            self.aggregator.flush()
+        statements = [
+            query['sql'].split()[0] for query in queries
+            if 'SAVEPOINT' not in query['sql']
+        ]
+        self.assertEqual(statements, ['UPDATE'] * 3)
+        self.assert_flushed([0.01, 0.2, 0.05, 3.0, 0.2])
+
+    def test_failed_flush_keeps_values(self):
+        self.record([0.01, 0.2])
+        with mock.patch.object(
+            self.aggregator,
+            '_flush_counters',
+            side_effect=OperationalError('lock timeout')
+        ), self.assertLogs('core.metrics', 'ERROR'):
+            self.aggregator.flush()
+
+        # Гистограммы, записанные до ошибки, откатываются вместе с ней
+        self.assertFalse(MetricsHistogram.objects.filter(count__gt=0).exists())
+        self.record([0.5])
+        self.aggregator.flush()
+        self.assert_flushed([0.01, 0.2, 0.5])
+
+
+class InternTermsTest(TestCase):
+    """Добавление слов в словарь."""
+
+    def test_insert_order(self):
+        Term.objects.create(word='б')
+        ids = intern_terms(['г', 'б', 'а', 'г', 'в'])
+        self.assertEqual(list(ids), ['г', 'б', 'а', 'в'])
+        # Новые слова вставлены в отсортированном порядке
+        self.assertLess(ids['а'], ids['в'])
+        self.assertLess(ids['в'], ids['г'])
+        self.assertEqual(
+            dict(Term.objects.values_list('word', 'pk')), ids
+        )
+
+
+class EnginesTest(SimpleTestCase):
+    """Совпадение результатов движков расчета."""
+
+    @override_settings(STATISTICS_CHUNK_SIZE=7)
+    def test_engines_match(self):
+        engines = (PythonEngine(), NumpyEngine())
+        for count, vocabulary in ((1, 10), (50, 40), (300, 2000)):
+            with self.subTest(count=count, vocabulary=vocabulary):
+                vectors = list(synthetic_vectors(count, 50, vocabulary))
+                results = []
+                for engine in engines:
+                    term_counts, doc_freq, total_docs, total_words = (
+                        engine.accumulate(vectors)
+                    )
+                    terms = sorted(term_counts)
+                    results.append((
+                        term_counts,
+                        doc_freq,
+                        engine.tf(
+                            [term_counts[term] for term in terms], total_words
+                        ),
+                        engine.idf(
+                            [doc_freq[term] for term in terms], total_docs
+                        ),
+                    ))
+                # Результаты должны совпадать побитово, иначе слова с равным
+                # TF-IDF выводятся в разном порядке
+                self.assertEqual(results[0], results[1])
+
+    def test_idf_matches(self):
+        # Для части таких частот np.log и math.log различаются
+        # в последнем знаке
+        total_docs = 7919
+        doc_freqs = list(range(1, total_docs + 1))
+        self.assertEqual(
+            NumpyEngine().idf(doc_freqs, total_docs),
+            PythonEngine().idf(doc_freqs, total_docs)
+        )
+
+
+class CollectionIndexTest(TestCase):
+    """
+    Индекс коллекции, поддерживаемый сигналами, совпадает с перестроенным.
+
+    Состав коллекций меняется всеми способами: add/remove/clear с обеих
+    сторон связи, удаление документов и пакетная загрузка в коллекцию.
+    """
+
+    texts = (
+        'мама мыла раму и раму мыла',
+        'папа читал газету и пил чай',
+        'мама и папа пили чай с вареньем',
+        'раму мыли долго и тщательно',
+    )
+
+    def setUp(self):
+        owner = MyUser.objects.create_user('indexer', password='password')
+        self.collections = [
+            Collections.objects.create(name='все слова', owner=owner),
+            Collections.objects.create(
+                name='конвейер',
+                owner=owner,
+                stop_words=True,
+                stemming=True,
+                min_word_length=3
+            ),
+        ]
+        results = bulk_create_documents(
+            [
+                SimpleUploadedFile(f'{index}.txt', text.encode())
+                for index, text in enumerate(self.texts)
+            ],
+            owner,
+            self.collections[0]
+        )
+        self.documents = [
+            Document.objects.get(pk=result['id']) for result in results
+        ]
+
+    def index_state(self, collection):
+        collection = Collections.objects.get(pk=collection.pk)
+        return (
+            collection.documents_count,
+            collection.total_words,
+            sorted(collection.terms.values_list(
+                'term_id', 'doc_freq', 'term_freq'
+            )),
+        )
+
+    def assert_index(self, step):
+        for collection in self.collections:
+            with self.subTest(step=step, collection=collection.name):
+                state = self.index_state(collection)
+                # Перестроенный индекс считается в точке сохранения и
+                # откатывается, чтобы следующие шаги проверяли обновления
+                # приращениями
+                with transaction.atomic():
+                    rebuild_collection_index(collection)
+                    expected = self.index_state(collection)
+                    transaction.set_rollback(True)
+                self.assertEqual(state, expected)
+
+    def test_membership_changes(self):
+        first, second, third, fourth = self.documents
+        plain, pipeline = self.collections
+        self.assert_index('bulk_create_documents')
+        self.assertEqual(self.index_state(plain)[0], 4)
+
+        steps = (
+            ('document.collections.add',
+             lambda: first.collections.add(pipeline)),
+            ('collection.documents.add',
+             lambda: pipeline.documents.add(second, third, first)),
+            ('collection.documents.remove',
+             lambda: plain.documents.remove(first, second)),
+            ('document.collections.remove',
+             lambda: third.collections.remove(plain, pipeline)),
+            ('remove без связи',
+             lambda: third.collections.remove(plain)),
+            ('document.collections.set',
+             lambda: fourth.collections.set([pipeline])),
+            ('document.collections.clear',
+             lambda: second.collections.clear()),
+            ('collection.documents.set',
+             lambda: plain.documents.set([first, third])),
+            ('collection.documents.clear',
+             lambda: pipeline.documents.clear()),
+            ('collection.documents.add после clear',
+             lambda: pipeline.documents.add(first, second, fourth)),
+            ('document.delete', lambda: first.delete()),
+            ('QuerySet.delete',
+             lambda: Document.objects.filter(pk=fourth.pk).delete()),
+        )
+        for step, change in steps:
+            change()
+            self.assert_index(step)
+
+        self.assertEqual(self.index_state(plain)[0], 1)
+        self.assertEqual(self.index_state(pipeline)[0], 1)
@@ -0,0 +1,192 @@
+import atexit
+import multiprocessing
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Модуль не зависит от Django: его функции выполняются в дочерних процессах,
+# запущенных методом spawn
+
+WHITESPACE_RE = re.compile(r'\s')
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile(r'[а-яё]')
+
+# Стоп-слова русского и английского языков (в нижнем регистре)
+STOP_WORDS = frozenset('''
+    а без более бы был была были было быть в вам вас весь во вот все всего
+    всех вы где да даже для до его ее её если есть еще ещё же за здесь и из
+    или им их к как какая какой когда кто ли либо между меня мне можно мой
+    мы на над надо наш не него нее неё нет ни них но ну о об однако он она
+    они оно от очень по под при с со так также такой там те тем то того тоже
+    той только том ты у уже хотя чего чей чем что чтобы чье чья эта эти это
+    этого этой этом этот я
+    a about above after again against all am an and any are as at be because
+    been before being below between both but by can did do does doing down
+    during each few for from further had has have having he her here hers
+    herself him himself his how i if in into is it its itself just me more
+    most my myself no nor not now of off on once only or other our ours
+    ourselves out over own same she should so some such than that the their
+    theirs them themselves then there these they this those through to too
+    under until up very was we were what when where which while who whom why
+    will with you your yours yourself yourselves
+'''.split())
+
+_pool = None
+_pool_workers = None
+
+
+def iter_tokens(text):
+    """
+    Перебирает токены (слова) текста в нижнем регистре, не строя их список.
+    """
+    for match in TOKEN_RE.finditer(text.lower()):
+        yield match.group()
+
+
+def tokenize(text):
+    """Разбивает текст на токены (слова)."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def count_words(text):
+    """Подсчитывает частоты слов текста."""
+    # Counter по списку findall быстрее, чем по генератору iter_tokens:
+    # цикл по совпадениям целиком выполняется в C
+    return Counter(TOKEN_RE.findall(text.lower()))
+
+
+class TokenPipeline:
+    """
+    Конвейер обработки токенов: фильтр по минимальной длине, удаление
+    стоп-слов и стемминг (русский или английский стеммер Snowball по
+    алфавиту слова).
+
+    Этапы обрабатывают каждый токен независимо от соседних, поэтому результат
+    для слова запоминается.
+    """
+
+    def __init__(self, stop_words=False, stemming=False, min_length=1):
+        self.stop_words = STOP_WORDS if stop_words else frozenset()
+        self.min_length = min_length
+        self.stemmers = None
+        if stemming:
+            try:
+                import snowballstemmer
+            except ImportError as error:
+                raise RuntimeError(
+                    'Для стемминга требуется пакет snowballstemmer'
+                ) from error
+            self.stemmers = {
+                language: snowballstemmer.stemmer(language)
+                for language in ('russian', 'english')
+            }
+        self._processed = {}
+
+    @property
+    def is_identity(self):
+        """True, если конвейер не меняет токены."""
+        return (
+            not self.stop_words
+            and self.stemmers is None
+            and self.min_length <= 1
+        )
+
+    def process_word(self, word):
+        """Возвращает обработанное слово или None, если слово отброшено."""
+        try:
+            return self._processed[word]
+        except KeyError:
+            pass
+        if len(word) < self.min_length or word in self.stop_words:
+            result = None
+        elif self.stemmers is not None:
+            language = 'russian' if CYRILLIC_RE.search(word) else 'english'
+            result = self.stemmers[language].stemWord(word)
+        else:
+            result = word
+        self._processed[word] = result
+        return result
+
+    def process(self, tokens):
+        """Обрабатывает поток токенов, пропуская отброшенные."""
+        process_word = self.process_word
+        for token in tokens:
+            word = process_word(token)
+            if word is not None:
+                yield word
+
+
+def split_text(text, chunk_size):
+    """
+    Разбивает текст на части длиной около chunk_size символов.
+
+    Границы частей проходят по пробельным символам, поэтому ни одно слово
+    не разрезается и токенизация частей дает те же слова, что и целого текста.
+    """
+    start = 0
+    length = len(text)
+    while start < length:
+        end = start + chunk_size
+        if end >= length:
+            yield text[start:]
+            return
+        match = WHITESPACE_RE.search(text, end)
+        if match is None:
+            yield text[start:]
+            return
+        yield text[start:match.end()]
+        start = match.end()
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown()
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        _pool_workers = workers
+    return _pool
+
+
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+atexit.register(_shutdown_pool)
+
+
+def count_words_parallel(texts, workers, threshold, chunk_size):
+    """
+    Подсчитывает частоты слов для списка текстов в пуле процессов.
+
+    Тексты разбиваются на части (см. split_text), части распределяются по
+    процессам, а частичные Counter объединяются для каждого текста. Если общий
+    объем текстов меньше threshold символов или workers <= 1, подсчет
+    выполняется в текущем процессе.
+
+    Returns:
+        list: Counter частот слов для каждого текста в исходном порядке
+    """
+    if workers <= 1 or sum(len(text) for text in texts) < threshold:
+        return [count_words(text) for text in texts]
+
+    indexes = []
+    pieces = []
+    for index, text in enumerate(texts):
+        for piece in split_text(text, chunk_size):
+            indexes.append(index)
+            pieces.append(piece)
+
+    results = [Counter() for _ in texts]
+    partial_counts = _get_pool(workers).map(
+        count_words,
+        pieces,
+        chunksize=max(1, len(pieces) // (workers * 4))
+    )
+    for index, partial_count in zip(indexes, partial_counts):
+        results[index].update(partial_count)
+    return results
@@ -19,6 +19,43 @@ THROTTLE_USER_RATE = os.getenv('THROTTLE_USER_RATE', default='100/minute')
 
 DISPLAYED_WORDS = int(os.getenv('DISPLAYED_WORDS', default=50))
 
+SEARCH_RESULTS = int(os.getenv('SEARCH_RESULTS', default=10))
+SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', default=100))
+
+STATISTICS_CHUNK_SIZE = int(os.getenv('STATISTICS_CHUNK_SIZE', default=2000))
+
+TFIDF_ENGINE = os.getenv('TFIDF_ENGINE', default='python')
+
+TOKENIZE_WORKERS = int(os.getenv('TOKENIZE_WORKERS', default=os.cpu_count() or 1))
+TOKENIZE_PARALLEL_THRESHOLD = int(
+    os.getenv('TOKENIZE_PARALLEL_THRESHOLD', default=1048576)
+)
+TOKENIZE_CHUNK_SIZE = int(os.getenv('TOKENIZE_CHUNK_SIZE', default=262144))
+
+BULK_UPLOAD_BATCH_SIZE = int(os.getenv('BULK_UPLOAD_BATCH_SIZE', default=500))
+
+UPLOAD_MAX_FILES = int(os.getenv('UPLOAD_MAX_FILES', default=10000))
+UPLOAD_MAX_FILE_SIZE = int(os.getenv('UPLOAD_MAX_FILE_SIZE', default=16777216))
+UPLOAD_MAX_TOTAL_SIZE = int(
+    os.getenv('UPLOAD_MAX_TOTAL_SIZE', default=268435456)
+)
+
+HUFFMAN_CACHE_MAX_SIZE = int(
+    os.getenv('HUFFMAN_CACHE_MAX_SIZE', default=67108864)
+)
+
+STATISTICS_JOB_TIMEOUT = int(os.getenv('STATISTICS_JOB_TIMEOUT', default=600))
+
+SERVER_MODE = os.getenv('SERVER_MODE', default='wsgi')
+ASYNC_VIEWS = SERVER_MODE == 'asgi'
+ASYNC_EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', default=4))
+
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', default=10))
+
+METRICS_ROW_COUNTS_TIMEOUT = int(
+    os.getenv('METRICS_ROW_COUNTS_TIMEOUT', default=60)
+)
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -82,6 +119,23 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'users.MyUser'
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='tfidf'),
+        'TIMEOUT': int(os.getenv('STATISTICS_CACHE_TIMEOUT', default=3600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', default=1000)),
+        },
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -144,7 +198,12 @@ REST_FRAMEWORK = {
     'DEFAULT_THROTTLE_RATES': {
         'anon': THROTTLE_ANON_RATE,
         'user': THROTTLE_USER_RATE,
-    }
+    },
+
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 SIMPLE_JWT = {